@@ -0,0 +1,112 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from cli import write_table
+from engine import (
+    ESTRATEGIAS_COMPILADAS, MERCADOS, FeatureStore, build_strategy_matrix, check_moving_averages,
+    reduce_markets, reduce_strategies, rolling_hit_rates, settle_home_back, settle_markets,
+    summarize_backtest, summarize_markets
+)
+from loader import FORMATOS, read_matches
+
+# Nome da linha com a soma de todas as ligas
+LIGA_TOTAL = "Todas"
+
+# Arquivos de histórico a partir de caminhos de arquivos ou pastas (uma liga por arquivo)
+def find_history_files(caminhos):
+    arquivos = []
+    for caminho in map(Path, caminhos):
+        if caminho.is_dir():
+            arquivos.extend(sorted(p for p in caminho.iterdir() if p.suffix.lower() in FORMATOS))
+        else:
+            arquivos.append(caminho)
+    return arquivos
+
+# Agregados de uma liga: jogos, acertos e lucro por estratégia (casa e todos os mercados)
+# e a análise das médias. Usa um FeatureStore próprio, sem o memo de get_feature_store,
+# para o histórico da liga ser liberado assim que ela termina.
+def backtest_league(df, comissao=0.0, por_responsabilidade=False):
+    nomes = ESTRATEGIAS_COMPILADAS["Nomes"]
+    mascaras = build_strategy_matrix(FeatureStore(df), ESTRATEGIAS_COMPILADAS)
+    acerto, lucro = settle_home_back(df)
+    total_jogos, acertos, lucro_total = reduce_strategies(mascaras, acerto, lucro)
+    acertos_mercados, lucros_mercados = settle_markets(df, None, comissao, por_responsabilidade)
+    _, acertos_mercados, lucro_mercados = reduce_markets(mascaras, acertos_mercados, lucros_mercados)
+    medias_moveis = rolling_hit_rates(pd.DataFrame(mascaras, columns=nomes), acerto)
+    return {
+        "Jogos": total_jogos,
+        "Acertos": acertos,
+        "Lucro": lucro_total,
+        "Acertos Mercados": acertos_mercados,
+        "Lucro Mercados": lucro_mercados,
+        "Médias": check_moving_averages(medias_moveis, nomes)
+    }
+
+# Executado nos processos: lê o histórico da liga (a leitura e a conversão da planilha são a
+# parte mais lenta) e devolve só os agregados, então cada processo tem uma liga por vez na memória
+def _backtest_task(tarefa):
+    arquivo, comissao, por_responsabilidade = tarefa
+    return Path(arquivo).stem, backtest_league(read_matches(arquivo), comissao, por_responsabilidade)
+
+# Resumos por liga e da soma das ligas, com a liga como primeira coluna. As médias móveis
+# dependem da ordem dos jogos dentro de cada histórico, então só existem por liga.
+def merge_results(resultados):
+    nomes = ESTRATEGIAS_COMPILADAS["Nomes"]
+    mercados = list(MERCADOS)
+    total = {
+        chave: sum(resultado[chave] for _, resultado in resultados)
+        for chave in ["Jogos", "Acertos", "Lucro", "Acertos Mercados", "Lucro Mercados"]
+    }
+
+    relatorio = {"Backtest": [], "Mercados": [], "Melhor Mercado": [], "Médias": []}
+    for liga, resultado in resultados + [(LIGA_TOTAL, total)]:
+        resumo = summarize_backtest(nomes, resultado["Jogos"], resultado["Acertos"], resultado["Lucro"])
+        por_mercado = summarize_markets(
+            nomes, mercados, resultado["Jogos"], resultado["Acertos Mercados"], resultado["Lucro Mercados"]
+        )
+        relatorio["Backtest"].extend({"Liga": liga, **linha} for linha in resumo)
+        relatorio["Mercados"].extend({"Liga": liga, **linha} for linha in por_mercado["Mercados"])
+        relatorio["Melhor Mercado"].extend({"Liga": liga, **linha} for linha in por_mercado["Melhor Mercado"])
+        relatorio["Médias"].extend({"Liga": liga, **linha} for linha in resultado.get("Médias", []))
+    return relatorio
+
+# Backtest de vários históricos em paralelo, uma tarefa por arquivo: cada processo lê,
+# converte e processa a sua liga, e só os agregados voltam para o processo principal
+def backtest_files(arquivos, processos=None, comissao=0.0, por_responsabilidade=False):
+    tarefas = [(arquivo, comissao, por_responsabilidade) for arquivo in arquivos]
+    if processos == 1:
+        resultados = [_backtest_task(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_backtest_task, tarefas))
+    return merge_results(resultados)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest em lote: um histórico por liga, em paralelo")
+    parser.add_argument("historicos", nargs="+", help="Arquivos de histórico ou pastas com eles")
+    parser.add_argument("--processos", type=int, help="Processos em paralelo (padrão: todos os núcleos)")
+    parser.add_argument("--comissao", type=float, default=0.0, help="Comissão sobre o lucro das apostas ganhas (ex.: 0.05)")
+    parser.add_argument("--lay-por-responsabilidade", action="store_true", help="Lay com responsabilidade fixa de 1 unidade em vez de stake de 1")
+    parser.add_argument("--saida", default="resultados", help="Pasta onde os resultados são gravados")
+    parser.add_argument("--formato", choices=["csv", "json"], default="csv", help="Formato dos arquivos de saída")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    arquivos = find_history_files(args.historicos)
+    if not arquivos:
+        raise SystemExit("Nenhum arquivo de histórico encontrado")
+
+    relatorio = backtest_files(arquivos, args.processos, args.comissao, args.lay_por_responsabilidade)
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    write_table(pd.DataFrame(relatorio["Backtest"]), saida / "resumo_backtest_ligas", args.formato)
+    write_table(pd.DataFrame(relatorio["Mercados"]), saida / "backtest_mercados_ligas", args.formato)
+    write_table(pd.DataFrame(relatorio["Melhor Mercado"]), saida / "melhor_mercado_ligas", args.formato)
+    write_table(pd.DataFrame(relatorio["Médias"]), saida / "analise_medias_ligas", args.formato)
+
+if __name__ == "__main__":
+    main()
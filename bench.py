@@ -0,0 +1,180 @@
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from engine import (
+    COLUNAS_PROBABILIDADES, DEFINICOES_VARS, ESTRATEGIAS_COMPILADAS, TABELA_ESTRATEGIAS, FeatureStore,
+    analyze_daily_games, build_strategy_matrix, check_moving_averages, rolling_hit_rates, run_backtest,
+    run_market_backtest, settle_home_back
+)
+from loader import read_matches
+from staking import simulate_staking
+from synthetic import generate_matches
+
+TAMANHOS_PADRAO = [10_000, 100_000, 1_000_000]
+
+# Verificação do Kelly: faixas de odd da casa usadas como estratégias, tamanho do histórico
+# sem vantagem (cada faixa com milhares de jogos, para a sorte não dominar) e fração máxima
+# dos jogos de cada faixa (em média) em que o Kelly pode apostar
+FAIXAS_ODDS_KELLY = [(1.0, 2.0), (2.0, 3.0), (3.0, 5.0), (5.0, np.inf)]
+LINHAS_VERIFICACAO_KELLY = 200_000
+LIMITE_APOSTAS_KELLY = 0.05
+
+# Etapas do pipeline, cada uma recebe o contexto com os resultados das anteriores.
+# O armazém de variáveis é sempre novo, para não medir o memo de get_feature_store.
+def _variaveis(ctx):
+    return {"vars_dict": FeatureStore(ctx["df"]).to_dict()}
+
+def _estrategias(ctx):
+    matriz = build_strategy_matrix(FeatureStore(ctx["df"]), ESTRATEGIAS_COMPILADAS)
+    return {"matriz": pd.DataFrame(matriz, index=ctx["df"].index, columns=ESTRATEGIAS_COMPILADAS["Nomes"])}
+
+def _backtest(ctx):
+    return {"backtest": run_backtest(ctx["df"], ctx["matriz"])}
+
+def _mercados(ctx):
+    return {"mercados": run_market_backtest(ctx["df"], ctx["matriz"])}
+
+def _medias(ctx):
+    acerto, _ = settle_home_back(ctx["df"])
+    medias_moveis = rolling_hit_rates(ctx["matriz"], acerto)
+    return {"medias": check_moving_averages(medias_moveis, ctx["matriz"].columns)}
+
+def _jogos_do_dia(ctx):
+    return {"jogos": analyze_daily_games(ctx["df_daily"], list(ctx["matriz"].columns))}
+
+ETAPAS = [
+    ("pre_calculate_all_vars", _variaveis),
+    ("apply_strategies", _estrategias),
+    ("run_backtest", _backtest),
+    ("run_market_backtest", _mercados),
+    ("check_moving_averages", _medias),
+    ("analyze_daily_games", _jogos_do_dia)
+]
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Mede cada etapa: tempo (melhor de N repetições, sem tracemalloc) e pico de memória
+# alocada (uma execução separada com tracemalloc, que deixa o código mais lento)
+def run_benchmark(n_linhas, repeticoes=3, seed=0):
+    ctx = {
+        "df": generate_matches(n_linhas, seed=seed),
+        "df_daily": generate_matches(1_000, seed=seed + 1)
+    }
+    resultados = []
+    for etapa, funcao in ETAPAS:
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            saida = funcao(ctx)
+            tempos.append(time.perf_counter() - inicio)
+
+        tracemalloc.start()
+        funcao(ctx)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ctx.update(saida)
+        resultados.append({
+            "Etapa": etapa,
+            "Linhas": n_linhas,
+            "Segundos": min(tempos),
+            "Pico de Memória (MB)": pico / 2 ** 20
+        })
+    return resultados
+
+# Máscaras como no app original: VARs calculadas uma a uma com Series do pandas sobre as
+# odds em float64 e cada estratégia filtrada pelas suas faixas
+def reference_strategy_matrix(df):
+    def prob(nome):
+        return 1 / df[COLUNAS_PROBABILIDADES[nome]].astype(float)
+
+    variaveis = {}
+    matriz = pd.DataFrame(True, index=df.index, columns=ESTRATEGIAS_COMPILADAS["Nomes"])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for nome, var, lo, hi in TABELA_ESTRATEGIAS:
+            if var not in variaveis:
+                variaveis[var] = pd.Series(np.asarray(DEFINICOES_VARS[var](prob), dtype=float), index=df.index)
+            matriz[nome] &= (variaveis[var] >= lo) & (variaveis[var] <= hi)
+    return matriz
+
+# Verificação de regressão: o histórico sintético passa pelo loader (CSV) e pelo motor, e as
+# máscaras têm de ser iguais às de referência, célula a célula. Devolve as células diferentes.
+def check_masks(n_linhas, seed=0):
+    df = generate_matches(n_linhas, seed=seed)
+    with tempfile.TemporaryDirectory() as pasta:
+        arquivo = Path(pasta) / "historico.csv"
+        df.to_csv(arquivo, index=False)
+        lido = read_matches(arquivo)
+    matriz = build_strategy_matrix(FeatureStore(lido), ESTRATEGIAS_COMPILADAS)
+    return int(np.count_nonzero(matriz != reference_strategy_matrix(df).to_numpy()))
+
+# Verificação do Kelly em um histórico sem vantagem: a vitória da casa é sorteada com a
+# probabilidade das odds 1X2 sem a margem, então nenhuma faixa de odds tem vantagem e o
+# Kelly (inteiro) quase não deve apostar. Devolve a fração de jogos apostados por faixa.
+def check_kelly(n_linhas=LINHAS_VERIFICACAO_KELLY, seed=0):
+    df = generate_matches(n_linhas, seed=seed)
+    implicitas = 1 / df[['Odd_H_Back', 'Odd_D_Back', 'Odd_A_Back']].to_numpy()
+    sorteios = np.random.default_rng([seed, 1]).random(len(df))
+    df['Goals_H'] = (sorteios < implicitas[:, 0] / implicitas.sum(axis=1)).astype(float)
+    df['Goals_A'] = 0.0
+
+    odd = df['Odd_H_Back'].to_numpy()
+    faixas = pd.DataFrame({f"Odds {lo:g}-{hi:g}": (odd >= lo) & (odd < hi) for lo, hi in FAIXAS_ODDS_KELLY})
+    curvas = simulate_staking(df, faixas, 'Kelly', fracao_kelly=1.0)["Curvas"]
+    return (curvas["Stake"] > 0).groupby(curvas["Estratégia"], sort=False).mean()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark das etapas do backtest com jogos sintéticos")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO, help="Linhas do histórico sintético")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições por etapa (vale o menor tempo)")
+    parser.add_argument("--seed", type=int, default=0, help="Semente do gerador sintético")
+    parser.add_argument("--saida", default="benchmarks.jsonl", help="Arquivo JSON Lines onde os resultados são acrescentados")
+    parser.add_argument("--verificar", action="store_true", help="Só verificar as máscaras (contra a referência) em cada tamanho e o Kelly em um histórico sem vantagem")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.verificar:
+        diferentes = {n_linhas: check_masks(n_linhas, args.seed) for n_linhas in args.tamanhos}
+        for n_linhas, celulas in diferentes.items():
+            print(f"{n_linhas:>10,} linhas  {celulas} células diferentes da referência")
+        if any(diferentes.values()):
+            raise SystemExit("As máscaras das estratégias mudaram em relação à referência")
+        apostados = check_kelly(seed=args.seed)
+        media = apostados.mean()
+        print(f"{LINHAS_VERIFICACAO_KELLY:>10,} linhas  Kelly sem vantagem apostou, em média, em {media:.1%} dos jogos de cada faixa ("
+              + ", ".join(f"{faixa} {fracao:.1%}" for faixa, fracao in apostados.items()) + ")")
+        if media > LIMITE_APOSTAS_KELLY:
+            raise SystemExit("O Kelly aposta em um histórico sem vantagem")
+        return
+    execucao = {
+        "Data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "Commit": _git_commit(),
+        "Python": platform.python_version(),
+        "Máquina": platform.machine()
+    }
+    with open(args.saida, "a", encoding="utf-8") as arquivo:
+        for n_linhas in args.tamanhos:
+            for resultado in run_benchmark(n_linhas, args.repeticoes, args.seed):
+                print(f"{resultado['Etapa']:<24} {n_linhas:>10,} linhas  "
+                      f"{resultado['Segundos']:8.3f} s  {resultado['Pico de Memória (MB)']:9.1f} MB")
+                arquivo.write(json.dumps({**execucao, **resultado}, ensure_ascii=False) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from engine import approved_daily_games, approved_strategies, backtest_history, settle_home_back
+from grouped import AGRUPAMENTOS, grouped_backtest
+from loader import read_matches
+from overlap import aggregate_daily_stakes, overlap_matrices, select_low_overlap
+from profiling import Profiler
+from significance import bootstrap_significance
+from staking import METODOS_STAKE, simulate_staking
+from walkforward import walk_forward
+
+# Execução sem Streamlit: lê histórico (e jogos do dia), roda o backtest e grava os resultados
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest de Estratégias de Apostas (sem interface)")
+    parser.add_argument("historico", help="Planilha histórica (xlsx, csv, parquet ou feather)")
+    parser.add_argument("--diario", help="Planilha com os jogos do dia")
+    parser.add_argument("--saida", default="resultados", help="Pasta onde os resultados são gravados")
+    parser.add_argument("--formato", choices=["csv", "json"], default="csv", help="Formato dos arquivos de saída")
+    parser.add_argument("--comissao", type=float, default=0.0, help="Comissão sobre o lucro das apostas ganhas (ex.: 0.05)")
+    parser.add_argument("--lay-por-responsabilidade", action="store_true", help="Lay com responsabilidade fixa de 1 unidade em vez de stake de 1")
+    parser.add_argument("--walk-forward", action="store_true", help="Simular dia a dia a aprovação pelas médias")
+    parser.add_argument("--agrupar", nargs="+", choices=list(AGRUPAMENTOS), help="Backtest por grupo (ex.: --agrupar Liga Temporada)")
+    parser.add_argument("--significancia", action="store_true", help="Intervalos de confiança, p-valores e drawdowns por bootstrap")
+    parser.add_argument("--mercado", default="Casa", help="Mercado usado na significância (ex.: Casa, Empate, 'Lay 0x0')")
+    parser.add_argument("--reamostras", type=int, default=5000, help="Reamostras por estratégia na significância")
+    parser.add_argument("--staking", choices=METODOS_STAKE, help="Simular a banca com stake fixa, percentual ou Kelly")
+    parser.add_argument("--banca", type=float, default=100.0, help="Banca inicial da simulação")
+    parser.add_argument("--stake", type=float, default=1.0, help="Stake da aposta fixa")
+    parser.add_argument("--percentual", type=float, default=0.02, help="Fração da banca por aposta (ex.: 0.02)")
+    parser.add_argument("--fracao-kelly", type=float, default=0.25, help="Fração do Kelly apostada")
+    parser.add_argument("--stop-loss", type=float, help="Encerrar ao perder esta fração da banca inicial (ex.: 0.5)")
+    parser.add_argument("--carteira", type=float, metavar="LIMITE", help="Só as aprovadas com sobreposição (Jaccard) até LIMITE entre si")
+    parser.add_argument("--stake-diaria", type=float, default=1.0, help="Stake por estratégia nos jogos do dia agrupados por partida")
+    parser.add_argument("--perfil", help="Arquivo JSON com o tempo e os contadores de cada etapa")
+    parser.add_argument("--perfil-detalhado", action="store_true", help="Incluir cProfile e tracemalloc no perfil (mais lento)")
+    return parser.parse_args(argv)
+
+def write_table(df, caminho, formato):
+    if formato == "csv":
+        df.to_csv(caminho.with_suffix(".csv"), index=False)
+    else:
+        df.to_json(caminho.with_suffix(".json"), orient="records", force_ascii=False, indent=2)
+
+def main(argv=None):
+    args = parse_args(argv)
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+
+    with Profiler(detalhado=args.perfil_detalhado) as perfil:
+        with perfil.stage("read_matches") as etapa:
+            df_historico = read_matches(args.historico)
+            etapa["Linhas"] = len(df_historico)
+        historico = backtest_history(df_historico, perfil, args.comissao, args.lay_por_responsabilidade)
+
+        write_table(pd.DataFrame(historico["Backtest"]), saida / "resumo_backtest", args.formato)
+        write_table(pd.DataFrame(historico["Mercados"]), saida / "backtest_mercados", args.formato)
+        write_table(pd.DataFrame(historico["Melhor Mercado"]), saida / "melhor_mercado", args.formato)
+        write_table(pd.DataFrame(historico["Médias"]), saida / "analise_medias", args.formato)
+        write_table(historico["Médias Móveis"], saida / "medias_moveis", args.formato)
+
+        if args.agrupar:
+            with perfil.stage("grouped_backtest", linhas=len(df_historico)):
+                cubo = grouped_backtest(
+                    df_historico, historico["Estratégias"], args.agrupar,
+                    comissao=args.comissao, por_responsabilidade=args.lay_por_responsabilidade
+                )
+            write_table(cubo, saida / "backtest_agrupado", args.formato)
+
+        if args.walk_forward:
+            with perfil.stage("walk_forward", linhas=len(df_historico)):
+                simulacao = walk_forward(df_historico)
+            write_table(simulacao["Resumo"], saida / "walk_forward_resumo", args.formato)
+            write_table(simulacao["Curva"], saida / "walk_forward_curva", args.formato)
+
+        if args.significancia:
+            with perfil.stage("bootstrap_significance", linhas=len(df_historico)):
+                significancia = bootstrap_significance(
+                    df_historico, historico["Estratégias"], args.mercado, args.reamostras,
+                    comissao=args.comissao, por_responsabilidade=args.lay_por_responsabilidade
+                )
+            write_table(significancia["Resumo"], saida / "significancia_resumo", args.formato)
+            write_table(significancia["Drawdowns"], saida / "significancia_drawdowns", args.formato)
+
+        if args.staking:
+            with perfil.stage("simulate_staking", linhas=len(df_historico)):
+                banca = simulate_staking(
+                    df_historico, historico["Estratégias"], args.staking, args.banca, args.stake, args.percentual,
+                    args.fracao_kelly, args.stop_loss, args.mercado, args.comissao, args.lay_por_responsabilidade
+                )
+            write_table(banca["Resumo"], saida / "staking_resumo", args.formato)
+            write_table(banca["Curvas"], saida / "staking_curvas", args.formato)
+
+        with perfil.stage("overlap_matrices", linhas=len(df_historico)):
+            _, lucro = settle_home_back(df_historico)
+            sobreposicao = overlap_matrices(historico["Estratégias"], lucro)
+        write_table(sobreposicao["Jaccard"].rename_axis("Estratégia").reset_index(), saida / "sobreposicao_jaccard", args.formato)
+        write_table(sobreposicao["Correlação"].rename_axis("Estratégia").reset_index(), saida / "correlacao_lucro", args.formato)
+
+        if args.diario:
+            estrategias = approved_strategies(historico["Médias"])
+            if args.carteira is not None:
+                estrategias = select_low_overlap(sobreposicao, estrategias, args.carteira)
+            df_daily = read_matches(args.diario)
+            jogos_do_dia = approved_daily_games(df_daily, historico, perfil, estrategias)
+            write_table(jogos_do_dia, saida / "jogos_aprovados", args.formato)
+            write_table(aggregate_daily_stakes(jogos_do_dia, args.stake_diaria), saida / "jogos_por_partida", args.formato)
+
+    if args.perfil:
+        perfil.to_json(args.perfil)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,689 @@
+import hashlib
+import os
+import tempfile
+import warnings
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import numpy as np
+
+from profiling import Profiler
+
+# Mercados liquidados pelo backtest: coluna da odd, tipo da aposta e a condição sobre os
+# gols (casa, fora) em que a seleção acontece. No lay, o acerto é a seleção não acontecer.
+MERCADOS = {
+    'Casa': ('Odd_H_Back', 'back', lambda h, a: h > a),
+    'Empate': ('Odd_D_Back', 'back', lambda h, a: h == a),
+    'Fora': ('Odd_A_Back', 'back', lambda h, a: h < a),
+    'Over 2.5': ('Odd_Over25_FT_Back', 'back', lambda h, a: h + a > 2.5),
+    'Under 2.5': ('Odd_Under25_FT_Back', 'back', lambda h, a: h + a < 2.5),
+    'BTTS Sim': ('Odd_BTTS_Yes_Back', 'back', lambda h, a: (h > 0) & (a > 0)),
+    'BTTS Não': ('Odd_BTTS_No_Back', 'back', lambda h, a: (h == 0) | (a == 0)),
+    'Lay 0x0': ('Odd_CS_0x0_Lay', 'lay', lambda h, a: (h == 0) & (a == 0)),
+    'Lay 0x1': ('Odd_CS_0x1_Lay', 'lay', lambda h, a: (h == 0) & (a == 1)),
+    'Lay 1x0': ('Odd_CS_1x0_Lay', 'lay', lambda h, a: (h == 1) & (a == 0))
+}
+
+# Ganho (líquido da comissão) se a aposta acerta, perda se erra e probabilidade implícita
+# de acerto de um mercado, por linha. Back: stake de 1, ganha odd - 1. Lay: ganha a stake de
+# 1 do apostador e perde a responsabilidade (odd - 1); com por_responsabilidade, a
+# responsabilidade é fixa em 1 e o ganho é 1 / (odd - 1). Nos dois casos a aposta empata
+# (lucro esperado zero, sem comissão) quando a probabilidade real é a implícita.
+def market_payoffs(df, mercado, comissao=0.0, por_responsabilidade=False):
+    coluna, tipo, _ = MERCADOS[mercado]
+    odd = df[coluna].to_numpy(dtype=float, na_value=np.nan)
+    uns = np.ones(len(odd))
+    with np.errstate(divide='ignore'):
+        if tipo == 'back':
+            ganho, perda, prob = odd - 1, uns, 1 / odd
+        elif por_responsabilidade:
+            ganho, perda, prob = 1 / np.where(odd > 1, odd - 1, np.nan), uns, 1 - 1 / odd
+        else:
+            ganho, perda, prob = uns, odd - 1, 1 - 1 / odd
+    return ganho * (1 - comissao), perda, prob
+
+# Resultado por linha de todos os mercados em uma única passada (n_linhas x n_mercados),
+# com os ganhos e perdas de market_payoffs. A comissão incide só sobre o lucro das apostas
+# ganhas. Jogos sem placar contam como aposta perdida; odds ausentes não contam no lucro.
+def settle_markets(df, mercados=None, comissao=0.0, por_responsabilidade=False):
+    mercados = list(mercados or MERCADOS)
+    gols_h = df['Goals_H'].to_numpy(dtype=float, na_value=np.nan)
+    gols_a = df['Goals_A'].to_numpy(dtype=float, na_value=np.nan)
+    com_placar = ~(np.isnan(gols_h) | np.isnan(gols_a))
+
+    acertos = np.empty((len(df), len(mercados)), dtype=bool, order='F')
+    lucros = np.empty((len(df), len(mercados)), order='F')
+    for k, mercado in enumerate(mercados):
+        _, tipo, condicao = MERCADOS[mercado]
+        selecao = condicao(gols_h, gols_a)
+        acertos[:, k] = selecao if tipo == 'back' else com_placar & ~selecao
+        ganho, perda, _ = market_payoffs(df, mercado, comissao, por_responsabilidade)
+        lucros[:, k] = np.where(acertos[:, k], ganho, -perda)
+    return acertos, np.nan_to_num(lucros, nan=0.0)
+
+# Resultado por linha do mercado casa (back), calculado uma única vez para todo o histórico
+def settle_home_back(df):
+    acertos, lucros = settle_markets(df, ['Casa'])
+    return acertos[:, 0], lucros[:, 0]
+
+# Linhas por bloco no produto lucro @ máscaras: a conversão da matriz booleana para float
+# ocupa só (bloco x estratégias) em vez de (n_linhas x estratégias) de uma vez
+TAMANHO_BLOCO = 65536
+
+# Jogos, acertos e lucro de todas as estratégias de uma vez (somas por coluna da matriz).
+# O lucro pode continuar de um total anterior (lucro_inicial): somando bloco a bloco na mesma
+# ordem, o resultado é idêntico ao de reduzir todas as linhas juntas.
+def reduce_strategies(mascaras, acerto, lucro, lucro_inicial=None):
+    total_jogos = mascaras.sum(axis=0)
+    acertos = mascaras[acerto].sum(axis=0)
+    lucro_total = np.zeros(mascaras.shape[1]) if lucro_inicial is None else np.array(lucro_inicial, dtype=float)
+    for inicio in range(0, len(mascaras), TAMANHO_BLOCO):
+        fim = inicio + TAMANHO_BLOCO
+        lucro_total += lucro[inicio:fim] @ mascaras[inicio:fim]
+    return total_jogos, acertos, lucro_total
+
+# Resumo do backtest no formato exibido, uma linha por estratégia
+def summarize_backtest(nomes, total_jogos, acertos, lucro_total):
+    resultados = []
+    for j, estrategia_nome in enumerate(nomes):
+        taxa_acerto = acertos[j] / total_jogos[j] if total_jogos[j] > 0 else 0
+        resultados.append({
+            "Estratégia": estrategia_nome,
+            "Total de Jogos": int(total_jogos[j]),
+            "Taxa de Acerto": f"{taxa_acerto:.2%}",
+            "Lucro Total": f"{lucro_total[j]:.2f}"
+        })
+    return resultados
+
+# Backtest vetorizado: todas as estratégias reduzidas de uma vez a partir da matriz de máscaras
+def run_backtest(df, matriz):
+    acerto, lucro = settle_home_back(df)
+    total_jogos, acertos, lucro_total = reduce_strategies(matriz.to_numpy(), acerto, lucro)
+    return summarize_backtest(matriz.columns, total_jogos, acertos, lucro_total)
+
+# Acertos e lucro de cada (estratégia, mercado): produtos das máscaras pelos resultados de
+# todos os mercados, em blocos de linhas como em reduce_strategies
+def reduce_markets(mascaras, acertos, lucros):
+    total_jogos = mascaras.sum(axis=0)
+    n_acertos = np.zeros((mascaras.shape[1], acertos.shape[1]))
+    lucro_total = np.zeros((mascaras.shape[1], acertos.shape[1]))
+    for inicio in range(0, len(mascaras), TAMANHO_BLOCO):
+        fim = inicio + TAMANHO_BLOCO
+        bloco = mascaras[inicio:fim].T.astype(float)
+        n_acertos += bloco @ acertos[inicio:fim]
+        lucro_total += bloco @ lucros[inicio:fim]
+    return total_jogos, n_acertos.astype(np.int64), lucro_total
+
+def _market_result(estrategia, mercado, jogos, acertos, lucro):
+    return {
+        "Estratégia": estrategia,
+        "Mercado": mercado,
+        "Total de Jogos": int(jogos),
+        "Taxa de Acerto": f"{acertos / jogos if jogos > 0 else 0:.2%}",
+        "Lucro Total": f"{lucro:.2f}",
+        "ROI": f"{lucro / jogos if jogos > 0 else 0:.2%}"
+    }
+
+# "Mercados" tem uma linha por (estratégia, mercado); "Melhor Mercado", a de maior lucro
+# de cada estratégia
+def summarize_markets(nomes, mercados, total_jogos, n_acertos, lucro_total):
+    por_mercado, melhor_mercado = [], []
+    for j, estrategia_nome in enumerate(nomes):
+        for k, mercado in enumerate(mercados):
+            por_mercado.append(_market_result(estrategia_nome, mercado, total_jogos[j], n_acertos[j, k], lucro_total[j, k]))
+        k = int(np.argmax(lucro_total[j]))
+        melhor_mercado.append(_market_result(estrategia_nome, mercados[k], total_jogos[j], n_acertos[j, k], lucro_total[j, k]))
+    return {"Mercados": por_mercado, "Melhor Mercado": melhor_mercado}
+
+# Backtest de todas as estratégias em todos os mercados, sem refiltrar o histórico por mercado
+def run_market_backtest(df, matriz, mercados=None, comissao=0.0, por_responsabilidade=False):
+    mercados = list(mercados or MERCADOS)
+    acertos, lucros = settle_markets(df, mercados, comissao, por_responsabilidade)
+    total_jogos, n_acertos, lucro_total = reduce_markets(matriz.to_numpy(), acertos, lucros)
+    return summarize_markets(matriz.columns, mercados, total_jogos, n_acertos, lucro_total)
+
+# Janelas das médias móveis de acerto, em número de jogos da estratégia (curta, longa)
+JANELAS_MEDIAS = (8, 40)
+
+# Regra de aprovação: média curta >= 50% e média longa > 50%
+def above_thresholds(media_curta, media_longa):
+    return (media_curta >= 0.5) & (media_longa > 0.5)
+
+# Médias móveis de acerto de todas as estratégias de uma vez, com somas acumuladas sobre
+# os jogos de cada estratégia. Uma linha por jogo de cada estratégia, na ordem do histórico;
+# quando ainda há menos jogos que a janela, a média usa os jogos disponíveis.
+def rolling_hit_rates(matriz, acerto, janelas=JANELAS_MEDIAS):
+    mascaras = matriz.to_numpy()
+    n_estrategias = mascaras.shape[1]
+    estrategia_idx, linha_idx = np.nonzero(mascaras.T)
+    acertos = acerto[linha_idx].astype(np.int64)
+
+    acumulado = np.cumsum(acertos)
+    antes = np.concatenate(([0], acumulado))
+    inicio = np.searchsorted(estrategia_idx, np.arange(n_estrategias))[estrategia_idx]
+    posicao = np.arange(len(linha_idx)) - inicio
+
+    medias_moveis = {
+        "Estratégia": np.asarray(matriz.columns)[estrategia_idx],
+        "Linha": matriz.index[linha_idx],
+        "Jogo": posicao + 1,
+        "Acerto": acertos
+    }
+    for janela in janelas:
+        inicio_janela = inicio + np.maximum(posicao - janela + 1, 0)
+        medias_moveis[f"Acertos {janela}"] = acumulado - antes[inicio_janela]
+        medias_moveis[f"Jogos {janela}"] = np.minimum(posicao + 1, janela)
+        medias_moveis[f"Média {janela}"] = medias_moveis[f"Acertos {janela}"] / medias_moveis[f"Jogos {janela}"]
+
+    curta, longa = JANELAS_MEDIAS
+    if curta in janelas and longa in janelas:
+        medias_moveis["Acima dos Limiares"] = above_thresholds(
+            medias_moveis[f"Média {curta}"], medias_moveis[f"Média {longa}"]
+        )
+    return pd.DataFrame(medias_moveis)
+
+# Análise das médias: último valor das médias móveis de cada estratégia
+def check_moving_averages(medias_moveis, nomes):
+    ultimos = medias_moveis.drop_duplicates("Estratégia", keep="last").set_index("Estratégia")
+    resultados = []
+    for estrategia_nome in nomes:
+        resultado = {"Estratégia": estrategia_nome}
+        medias = {}
+        for janela in JANELAS_MEDIAS:
+            if estrategia_nome in ultimos.index:
+                ultimo = ultimos.loc[estrategia_nome]
+                acertos, jogos = ultimo[f"Acertos {janela}"], ultimo[f"Jogos {janela}"]
+                medias[janela] = acertos / jogos
+            else:
+                acertos, jogos = 0, 0
+                medias[janela] = np.nan
+            resultado[f"Média {janela}"] = f"{medias[janela]:.2f} ({acertos} acertos em {jogos})"
+        resultado["Acima dos Limiares"] = bool(above_thresholds(*(medias[j] for j in JANELAS_MEDIAS)))
+        resultados.append(resultado)
+    return resultados
+
+# Analisar jogos do dia: as variáveis saem das odds do próprio dia e todas as estratégias
+# aprovadas são avaliadas de uma vez; uma linha por (estratégia, jogo), na ordem das estratégias
+def analyze_daily_games(df_daily, estrategias_aprovadas):
+    colunas = [coluna for coluna in ['Time', 'Home', 'Away'] if coluna in df_daily.columns]
+    if df_daily.empty or not estrategias_aprovadas:
+        return pd.DataFrame(columns=["Estratégia"] + colunas)
+
+    matriz = apply_strategies(df_daily)[estrategias_aprovadas].to_numpy()
+    estrategia_idx, linha_idx = np.nonzero(matriz.T)
+    jogos = df_daily.iloc[linha_idx][colunas].reset_index(drop=True)
+    jogos.insert(0, "Estratégia", np.asarray(estrategias_aprovadas)[estrategia_idx])
+    return jogos
+
+# Colunas de odds de onde saem as probabilidades implícitas
+COLUNAS_PROBABILIDADES = {
+    'pH': 'Odd_H_Back',
+    'pD': 'Odd_D_Back',
+    'pA': 'Odd_A_Back',
+    'pOver': 'Odd_Over25_FT_Back',
+    'pUnder': 'Odd_Under25_FT_Back',
+    'pBTTS_Y': 'Odd_BTTS_Yes_Back',
+    'pBTTS_N': 'Odd_BTTS_No_Back',
+    'p0x0': 'Odd_CS_0x0_Lay',
+    'p0x1': 'Odd_CS_0x1_Lay',
+    'p1x0': 'Odd_CS_1x0_Lay'
+}
+
+# Fórmulas das variáveis; cada uma recebe uma função que devolve a probabilidade pelo nome
+def _razao(a, b):
+    return lambda p: p(a) / p(b)
+
+def _diferenca(a, b):
+    return lambda p: np.abs(p(a) - p(b))
+
+def _diferenca_relativa(a, b, base):
+    return lambda p: np.abs(p(a) - p(b)) / p(base)
+
+def _angulo(a, b):
+    return lambda p: np.arctan((p(a) - p(b)) / 2) * 180 / np.pi
+
+# Desvio padrão amostral sobre a média, ignorando ausentes como o std/mean do pandas
+def _coeficiente_variacao(*nomes):
+    def calcular(p):
+        valores = np.column_stack([p(nome) for nome in nomes])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return np.nanstd(valores, axis=1, ddof=1) / np.nanmean(valores, axis=1)
+    return calcular
+
+DEFINICOES_VARS = {
+    'VAR01': _razao('pH', 'pD'),
+    'VAR02': _razao('pH', 'pA'),
+    'VAR03': _razao('pD', 'pH'),
+    'VAR04': _razao('pD', 'pA'),
+    'VAR05': _razao('pA', 'pH'),
+    'VAR06': _razao('pA', 'pD'),
+    'VAR07': _razao('pOver', 'pUnder'),
+    'VAR08': _razao('pUnder', 'pOver'),
+    'VAR09': _razao('pBTTS_Y', 'pBTTS_N'),
+    'VAR10': _razao('pBTTS_N', 'pBTTS_Y'),
+    'VAR11': _razao('pH', 'pOver'),
+    'VAR12': _razao('pD', 'pOver'),
+    'VAR13': _razao('pA', 'pOver'),
+    'VAR14': _razao('pH', 'pUnder'),
+    'VAR15': _razao('pD', 'pUnder'),
+    'VAR16': _razao('pA', 'pUnder'),
+    'VAR17': _razao('pH', 'pBTTS_Y'),
+    'VAR18': _razao('pD', 'pBTTS_Y'),
+    'VAR19': _razao('pA', 'pBTTS_Y'),
+    'VAR20': _razao('pH', 'pBTTS_N'),
+    'VAR21': _razao('pD', 'pBTTS_N'),
+    'VAR22': _razao('pA', 'pBTTS_N'),
+    'VAR23': _razao('p0x0', 'pH'),
+    'VAR24': _razao('p0x0', 'pD'),
+    'VAR25': _razao('p0x0', 'pA'),
+    'VAR26': _razao('p0x0', 'pOver'),
+    'VAR27': _razao('p0x0', 'pUnder'),
+    'VAR28': _razao('p0x0', 'pBTTS_Y'),
+    'VAR29': _razao('p0x0', 'pBTTS_N'),
+    'VAR30': _razao('p0x1', 'pH'),
+    'VAR31': _razao('p0x1', 'pD'),
+    'VAR32': _razao('p0x1', 'pA'),
+    'VAR33': _razao('p0x1', 'pOver'),
+    'VAR34': _razao('p0x1', 'pUnder'),
+    'VAR35': _razao('p0x1', 'pBTTS_Y'),
+    'VAR36': _razao('p0x1', 'pBTTS_N'),
+    'VAR37': _razao('p1x0', 'pH'),
+    'VAR38': _razao('p1x0', 'pD'),
+    'VAR39': _razao('p1x0', 'pA'),
+    'VAR40': _razao('p1x0', 'pOver'),
+    'VAR41': _razao('p1x0', 'pUnder'),
+    'VAR42': _razao('p1x0', 'pBTTS_Y'),
+    'VAR43': _razao('p1x0', 'pBTTS_N'),
+    'VAR44': _razao('p0x0', 'p0x1'),
+    'VAR45': _razao('p0x0', 'p1x0'),
+    'VAR46': _razao('p0x1', 'p0x0'),
+    'VAR47': _razao('p0x1', 'p1x0'),
+    'VAR48': _razao('p1x0', 'p0x0'),
+    'VAR49': _razao('p1x0', 'p0x1'),
+    'VAR50': _coeficiente_variacao('pH', 'pD', 'pA'),
+    'VAR51': _coeficiente_variacao('pOver', 'pUnder'),
+    'VAR52': _coeficiente_variacao('pBTTS_Y', 'pBTTS_N'),
+    'VAR53': _coeficiente_variacao('p0x0', 'p0x1', 'p1x0'),
+    'VAR54': _diferenca('pH', 'pA'),
+    'VAR55': _diferenca('pH', 'pD'),
+    'VAR56': _diferenca('pD', 'pA'),
+    'VAR57': _diferenca('pOver', 'pUnder'),
+    'VAR58': _diferenca('pBTTS_Y', 'pBTTS_N'),
+    'VAR59': _diferenca('p0x0', 'p0x1'),
+    'VAR60': _diferenca('p0x0', 'p1x0'),
+    'VAR61': _diferenca('p0x1', 'p1x0'),
+    'VAR62': _angulo('pA', 'pH'),
+    'VAR63': _angulo('pD', 'pH'),
+    'VAR64': _angulo('pA', 'pD'),
+    'VAR65': _angulo('pUnder', 'pOver'),
+    'VAR66': _angulo('pBTTS_N', 'pBTTS_Y'),
+    'VAR67': _angulo('p0x1', 'p0x0'),
+    'VAR68': _angulo('p1x0', 'p0x0'),
+    'VAR69': _angulo('p1x0', 'p0x1'),
+    'VAR70': _diferenca_relativa('pH', 'pA', 'pA'),
+    'VAR71': _diferenca_relativa('pH', 'pD', 'pD'),
+    'VAR72': _diferenca_relativa('pD', 'pA', 'pA'),
+    'VAR73': _diferenca_relativa('pOver', 'pUnder', 'pUnder'),
+    'VAR74': _diferenca_relativa('pBTTS_Y', 'pBTTS_N', 'pBTTS_N'),
+    'VAR75': _diferenca_relativa('p0x0', 'p0x1', 'p0x1'),
+    'VAR76': _diferenca_relativa('p0x0', 'p1x0', 'p1x0'),
+    'VAR77': _diferenca_relativa('p0x1', 'p1x0', 'p1x0'),
+}
+
+# Armazém de variáveis: cada VAR só é calculada quando pedida e fica guardada em uma coluna
+# de um único array contíguo (n_linhas x 77) em float64, para as faixas das estratégias
+# selecionarem exatamente os mesmos jogos que com as VARs calculadas uma a uma. Só as
+# colunas calculadas ocupam memória. Com um arquivo, o array é mapeado do disco (np.memmap).
+class FeatureStore:
+    def __init__(self, df, dtype=np.float64, arquivo=None):
+        self.index = df.index
+        self._df = df
+        self._probs = {}
+        self._posicao = {var: k for k, var in enumerate(DEFINICOES_VARS)}
+        self._calculadas = np.zeros(len(DEFINICOES_VARS), dtype=bool)
+        self._indice = None
+        formato = (len(df), len(DEFINICOES_VARS))
+        if arquivo is None:
+            self._dados = np.empty(formato, dtype=dtype, order='F')
+        else:
+            self._dados = np.lib.format.open_memmap(arquivo, mode='w+', dtype=dtype, shape=formato, fortran_order=True)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, var):
+        k = self._posicao[var]
+        if not self._calculadas[k]:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self._dados[:, k] = DEFINICOES_VARS[var](self.prob)
+            self._calculadas[k] = True
+        return self._dados[:, k]
+
+    def prob(self, nome):
+        if nome not in self._probs:
+            odds = self._df[COLUNAS_PROBABILIDADES[nome]].to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(divide='ignore'):
+                self._probs[nome] = 1 / odds
+        return self._probs[nome]
+
+    def calculadas(self):
+        return [var for var, k in self._posicao.items() if self._calculadas[k]]
+
+    # Bytes ocupados pelas VARs já calculadas e pelas probabilidades
+    @property
+    def nbytes(self):
+        return (
+            int(self._calculadas.sum()) * len(self) * self._dados.itemsize
+            + sum(prob.nbytes for prob in self._probs.values())
+        )
+
+    def to_dict(self):
+        return {var: pd.Series(self[var], index=self.index) for var in DEFINICOES_VARS}
+
+    # Índice ordenado das VARs, criado na primeira consulta e guardado junto com as VARs
+    @property
+    def indice(self):
+        if self._indice is None:
+            self._indice = VarIndex(self)
+        return self._indice
+
+# Índice ordenado por VAR (argsort + valores ordenados), montado uma vez por histórico e só
+# para as VARs consultadas. Cada faixa [lo, hi] vira duas buscas binárias; uma conjunção de
+# faixas parte da faixa com menos linhas e testa as demais só nessas linhas, então o custo
+# acompanha o número de jogos selecionados e não o tamanho do histórico.
+class VarIndex:
+    def __init__(self, features):
+        self._features = features
+        self._ordens = {}
+
+    def _ordem(self, var):
+        if var not in self._ordens:
+            valores = self._features[var]
+            # Empates não precisam de ordem estável: select devolve as linhas ordenadas
+            ordem = np.argsort(valores)
+            if len(ordem) < np.iinfo(np.int32).max:
+                ordem = ordem.astype(np.int32)
+            self._ordens[var] = (valores[ordem], ordem)
+        return self._ordens[var]
+
+    # Posições [inicio, fim) da faixa nos valores ordenados (NaN fica no fim e nunca entra)
+    def _intervalo(self, var, lo, hi):
+        ordenados, _ = self._ordem(var)
+        inicio = np.searchsorted(ordenados, lo, side='left')
+        fim = np.searchsorted(ordenados, hi, side='right')
+        return inicio, max(fim, inicio)
+
+    def count(self, var, lo, hi):
+        inicio, fim = self._intervalo(var, lo, hi)
+        return fim - inicio
+
+    # Linhas com lo <= var <= hi, na ordem dos valores
+    def rows(self, var, lo, hi):
+        inicio, fim = self._intervalo(var, lo, hi)
+        return self._ordem(var)[1][inicio:fim]
+
+    # Linhas (em ordem crescente) que atendem a todos os predicados (var, lo, hi)
+    def select(self, predicados):
+        if not predicados:
+            return np.arange(len(self._features))
+        tamanhos = [self.count(var, lo, hi) for var, lo, hi in predicados]
+        menor = int(np.argmin(tamanhos))
+        linhas = self.rows(*predicados[menor])
+        for k, (var, lo, hi) in enumerate(predicados):
+            if k != menor and len(linhas) > 0:
+                valores = self._features[var][linhas]
+                linhas = linhas[(valores >= lo) & (valores <= hi)]
+        return np.sort(linhas)
+
+    @property
+    def nbytes(self):
+        return sum(ordenados.nbytes + ordem.nbytes for ordenados, ordem in self._ordens.values())
+
+# Identificador do conteúdo das odds (e do índice) de um DataFrame
+def frame_fingerprint(df):
+    colunas = [col for col in COLUNAS_PROBABILIDADES.values() if col in df.columns]
+    hashes = pd.util.hash_pandas_object(df[colunas], index=True).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+# Armazéns já criados nesta sessão, do menos para o mais recentemente usado
+LIMITE_FEATURE_STORES = 4
+_feature_stores = OrderedDict()
+
+# Pasta opcional onde os arrays de variáveis são mapeados do disco em vez de ficarem na RAM
+PASTA_MEMMAP = os.environ.get("BACKTEST_MEMMAP_DIR")
+
+def _remove_file(arquivo):
+    try:
+        os.remove(arquivo)
+    except OSError:
+        pass
+
+# Com PASTA_MEMMAP, cada armazém tem um arquivo próprio (nome único, para sessões e processos
+# não escreverem no mesmo), apagado quando o armazém é descartado ou o processo termina
+def get_feature_store(df):
+    chave = frame_fingerprint(df)
+    if chave in _feature_stores:
+        _feature_stores.move_to_end(chave)
+    else:
+        if PASTA_MEMMAP:
+            Path(PASTA_MEMMAP).mkdir(parents=True, exist_ok=True)
+            descritor, arquivo = tempfile.mkstemp(prefix=f"{chave}-", suffix=".npy", dir=PASTA_MEMMAP)
+            os.close(descritor)
+            features = FeatureStore(df, arquivo=arquivo)
+            weakref.finalize(features, _remove_file, arquivo)
+        else:
+            features = FeatureStore(df)
+        _feature_stores[chave] = features
+        if len(_feature_stores) > LIMITE_FEATURE_STORES:
+            _feature_stores.popitem(last=False)
+    return _feature_stores[chave]
+
+# Pre-calcular variáveis (todas as 77, como Series alinhadas ao DataFrame)
+def pre_calculate_all_vars(df):
+    return get_feature_store(df).to_dict()
+
+# Faixa de VAR43 compartilhada por todas as estratégias
+FAIXA_VAR43 = ('VAR43', 0.1688, 0.1830)
+
+# Faixa específica de cada estratégia (variável, mínimo, máximo), na ordem das estratégias
+FAIXAS_ESTRATEGIAS = [
+    ('VAR60', 0.0047, 0.0110),
+    ('VAR76', 0.050, 0.125),
+    ('VAR45', 0.8333, 0.9166),
+    ('VAR32', 0.2500, 0.2750),
+    ('VAR24', 0.2248, 0.2413),
+    ('VAR65', 2.9288, 4.965),
+    ('VAR15', 0.5292, 0.5424),
+    ('VAR61', 0.0036, 0.0075),
+    ('VAR37', 0.2174, 0.2433),
+    ('VAR20', 0.7299, 0.8085),
+    ('VAR48', 1.0909, 1.20),
+    ('VAR21', 0.6053, 0.6181),
+    ('VAR77', 0.0434, 0.0937),
+    ('VAR74', 0.0, 0.040),
+    ('VAR38', 0.2913, 0.30),
+    ('VAR07', 0.7124, 0.8207),
+    ('VAR08', 1.2183, 1.4036),
+    ('VAR14', 0.6471, 0.7238),
+    ('VAR34', 0.1772, 0.2288),
+    ('VAR66', -0.1538, 1.1857),
+    ('VAR27', 0.1321, 0.1424),
+    ('VAR10', 0.9896, 1.0822),
+    ('VAR58', 0.00, 0.0208),
+    ('VAR09', 0.9240, 1.0104),
+    ('VAR29', 0.1469, 0.16),
+    ('VAR54', 0.0485, 0.0742),
+    ('VAR68', 0.2170, 0.3841),
+    ('VAR23', 0.180, 0.2191),
+    ('VAR26', 0.1712, 0.2155),
+    ('VAR41', 0.1553, 0.1583),
+    ('VAR33', 0.1536, 0.1812),
+    ('VAR35', 0.1354, 0.1565),
+    ('VAR18', 0.5253, 0.5655),
+    ('VAR30', 0.2400, 0.3150),
+    ('VAR25', 0.2207, 0.2423),
+    ('VAR28', 0.1062, 0.1241),
+    ('VAR42', 0.1533, 0.1634),
+    ('VAR01', 1.1807, 1.2804),
+    ('VAR03', 0.7809, 0.8468),
+    ('VAR12', 0.6564, 0.7434),
+    ('VAR22', 0.5408, 0.6123),
+    ('VAR70', 0.1347, 0.2064),
+    ('VAR63', -2.3843, -1.5319),
+    ('VAR71', 0.1860, 0.2804),
+    ('VAR59', 0.0155, 0.0208),
+    ('VAR11', 0.7028, 0.7363),
+    ('VAR75', 0.1428, 0.1747),
+    ('VAR40', 0.1927, 0.2171),
+    ('VAR39', 0.23, 0.2472),
+    ('VAR72', 0.250, 0.2869),
+    ('VAR57', 0.1361, 0.1750),
+    ('VAR46', 1.0, 1.0597),
+    ('VAR44', 0.9436, 1.000),
+    ('VAR67', 0.4822, 2.2614),
+    ('VAR31', 0.3285, 0.4949),
+    ('VAR36', 0.2019, 0.2576),
+    ('VAR69', -1.5240, -0.3797),
+    ('VAR49', 0.680, 0.8727),
+    ('VAR47', 1.1458, 1.4705),
+    ('VAR73', 0.00, 0.0515),
+    ('VAR13', 0.6978, 0.7639),
+    ('VAR19', 0.6635, 0.7417),
+    ('VAR62', 0.5185, 2.0514),
+    ('VAR55', 0.0845, 0.1209),
+    ('VAR02', 0.8194, 0.9509),
+    ('VAR05', 1.0516, 1.2203),
+    ('VAR56', 0.0630, 0.0729),
+    ('VAR16', 0.5129, 0.5721),
+    ('VAR17', 0.5967, 0.6268),
+    ('VAR64', 2.8089, 4.2769),
+    ('VAR06', 1.2131, 1.2792),
+    ('VAR04', 0.7817, 0.8243),
+]
+
+# Tabela declarativa das estratégias: (nome, variável, mínimo, máximo)
+# Cada estratégia é a conjunção de todos os seus predicados (intervalos fechados)
+TABELA_ESTRATEGIAS = [
+    (f"Estratégia {n}",) + predicado
+    for n, faixa in enumerate(FAIXAS_ESTRATEGIAS, start=1)
+    for predicado in (FAIXA_VAR43, faixa)
+]
+
+# Compilar a tabela: cada predicado distinto vira uma única coluna a ser avaliada
+def compile_strategies(tabela):
+    nomes = []
+    predicados = []
+    indice_predicado = {}
+    predicados_por_estrategia = {}
+    for nome, var, lo, hi in tabela:
+        chave = (var, lo, hi)
+        if chave not in indice_predicado:
+            indice_predicado[chave] = len(predicados)
+            predicados.append(chave)
+        if nome not in predicados_por_estrategia:
+            predicados_por_estrategia[nome] = []
+            nomes.append(nome)
+        predicados_por_estrategia[nome].append(indice_predicado[chave])
+
+    # Estratégias com menos predicados são completadas com a coluna "sempre verdadeira"
+    largura = max(len(ids) for ids in predicados_por_estrategia.values())
+    conjuncoes = np.full((len(nomes), largura), len(predicados), dtype=np.intp)
+    for j, nome in enumerate(nomes):
+        ids = predicados_por_estrategia[nome]
+        conjuncoes[j, :len(ids)] = ids
+
+    return {
+        "Nomes": nomes,
+        "Predicados": predicados,
+        "Conjunções": conjuncoes
+    }
+
+ESTRATEGIAS_COMPILADAS = compile_strategies(TABELA_ESTRATEGIAS)
+
+# Variáveis que alguma estratégia usa (as únicas que o pipeline precisa calcular)
+VARIAVEIS_ESTRATEGIAS = sorted({var for var, _, _ in ESTRATEGIAS_COMPILADAS["Predicados"]})
+
+# Matriz booleana (n_linhas x n_estratégias) em uma única passada;
+# só as VARs usadas pelas estratégias são calculadas
+def build_strategy_matrix(features, compiladas):
+    predicados = compiladas["Predicados"]
+    n_linhas = len(features[predicados[0][0]])
+    # Uma coluna contígua por predicado (ordem Fortran), inclusive na matriz resultante
+    avaliados = np.empty((n_linhas, len(predicados) + 1), dtype=bool, order='F')
+    for k, (var, lo, hi) in enumerate(predicados):
+        valores = np.asarray(features[var], dtype=float)
+        avaliados[:, k] = (valores >= lo) & (valores <= hi)
+    avaliados[:, -1] = True
+
+    # Conjunção coluna a coluna: nenhum array temporário (n_linhas x estratégias x predicados)
+    conjuncoes = compiladas["Conjunções"]
+    matriz = avaliados[:, conjuncoes[:, 0]]
+    for k in range(1, conjuncoes.shape[1]):
+        matriz &= avaliados[:, conjuncoes[:, k]]
+    return matriz
+
+# Definição das estratégias: máscara booleana por estratégia (uma coluna por estratégia)
+def apply_strategies(df):
+    features = get_feature_store(df)
+    matriz = build_strategy_matrix(features, ESTRATEGIAS_COMPILADAS)
+    return pd.DataFrame(matriz, index=df.index, columns=ESTRATEGIAS_COMPILADAS["Nomes"])
+
+# Pipeline completo sobre o histórico: variáveis, máscaras, backtest (casa e todos os
+# mercados) e médias. Cada etapa é cronometrada no perfil (um novo, se nenhum for passado).
+def backtest_history(df_historico, perfil=None, comissao=0.0, por_responsabilidade=False):
+    perfil = perfil or Profiler()
+    linhas = len(df_historico)
+
+    with perfil.stage("pre_calculate_all_vars", linhas=linhas) as etapa:
+        features = get_feature_store(df_historico)
+        for var in VARIAVEIS_ESTRATEGIAS:
+            features[var]
+        etapa["Bytes"] = features.nbytes
+
+    with perfil.stage("apply_strategies", linhas=linhas) as etapa:
+        estrategias = apply_strategies(df_historico)
+        etapa["Bytes"] = estrategias.memory_usage(index=False).sum()
+
+    with perfil.stage("run_backtest", linhas=linhas):
+        backtest_results = run_backtest(df_historico, estrategias)
+    perfil.count("Jogos por Estratégia", {r["Estratégia"]: r["Total de Jogos"] for r in backtest_results})
+
+    with perfil.stage("run_market_backtest", linhas=linhas) as etapa:
+        mercados_results = run_market_backtest(df_historico, estrategias, comissao=comissao, por_responsabilidade=por_responsabilidade)
+        etapa["Mercados"] = len(MERCADOS)
+
+    with perfil.stage("check_moving_averages", linhas=linhas) as etapa:
+        acerto, _ = settle_home_back(df_historico)
+        medias_moveis = rolling_hit_rates(estrategias, acerto)
+        medias_results = check_moving_averages(medias_moveis, estrategias.columns)
+        etapa["Bytes"] = medias_moveis.memory_usage(index=False).sum()
+
+    return {
+        "Variáveis": features,
+        "Estratégias": estrategias,
+        "Backtest": backtest_results,
+        "Mercados": mercados_results["Mercados"],
+        "Melhor Mercado": mercados_results["Melhor Mercado"],
+        "Médias Móveis": medias_moveis,
+        "Médias": medias_results,
+        "Perfil": perfil
+    }
+
+# Estratégias que passaram na análise das médias
+def approved_strategies(medias_results):
+    return [r["Estratégia"] for r in medias_results if r["Acima dos Limiares"]]
+
+# Jogos do dia das estratégias aprovadas no histórico (ou só das estratégias indicadas,
+# por exemplo uma carteira com pouca sobreposição entre as aprovadas)
+def approved_daily_games(df_daily, historico, perfil=None, estrategias=None):
+    perfil = perfil or Profiler()
+    if estrategias is None:
+        estrategias = approved_strategies(historico["Médias"])
+    with perfil.stage("analyze_daily_games", linhas=len(df_daily)) as etapa:
+        jogos = analyze_daily_games(df_daily, estrategias)
+        etapa["Jogos Aprovados"] = len(jogos)
+    return jogos
+
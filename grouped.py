@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from engine import settle_markets
+from loader import COLUNA_DATA, COLUNA_LIGA
+
+# Mês em que começa a temporada (julho: 2023/2024 vai de julho de 2023 a junho de 2024)
+MES_INICIO_TEMPORADA = 7
+
+def _temporada(df):
+    datas = df[COLUNA_DATA]
+    inicio = datas.dt.year - (datas.dt.month < MES_INICIO_TEMPORADA)
+    return (inicio.astype('Int64').astype('string') + "/" + (inicio + 1).astype('Int64').astype('string'))
+
+# Agrupamentos disponíveis: coluna de que dependem e como a chave do grupo é obtida
+AGRUPAMENTOS = {
+    'Liga': (COLUNA_LIGA, lambda df: df[COLUNA_LIGA]),
+    'Temporada': (COLUNA_DATA, _temporada),
+    'Ano': (COLUNA_DATA, lambda df: df[COLUNA_DATA].dt.year.astype('Int64')),
+    'Mês': (COLUNA_DATA, lambda df: df[COLUNA_DATA].dt.strftime('%Y-%m'))
+}
+
+COLUNAS_METRICAS = ["Total de Jogos", "Acertos", "Taxa de Acerto", "Lucro Total", "ROI"]
+
+# Agrupamentos que o DataFrame permite (as colunas de liga e data são opcionais)
+def available_groupings(df):
+    return [nome for nome, (coluna, _) in AGRUPAMENTOS.items() if coluna in df.columns]
+
+# Código do grupo de cada linha (combinação dos agrupamentos pedidos; -1 sem grupo) e as
+# chaves de cada código
+def group_codes(df, por):
+    faltando = [nome for nome in por if nome not in available_groupings(df)]
+    if faltando:
+        raise ValueError(f"Agrupamento indisponível (coluna ausente ou desconhecido): {', '.join(faltando)}")
+    chaves = pd.DataFrame({nome: AGRUPAMENTOS[nome][1](df) for nome in por}).reset_index(drop=True)
+    codigos = chaves.groupby(list(por), sort=True, observed=True, dropna=True).ngroup()
+    codigos = codigos.fillna(-1).to_numpy(dtype=np.int64)
+    validos = codigos >= 0
+    grupos = chaves[validos].assign(Grupo=codigos[validos]).drop_duplicates("Grupo").sort_values("Grupo")
+    return codigos, grupos.drop(columns="Grupo").reset_index(drop=True)
+
+# Backtest de todas as estratégias em cada grupo (liga, temporada, ano, mês ou combinações)
+# com uma única redução agrupada: cada par (estratégia, jogo) da matriz de máscaras soma
+# no seu (estratégia, grupo) via bincount, sem refiltrar o histórico por grupo.
+# Resultado em formato longo (um cubo "tidy"), pronto para pivotar; só pares com jogos.
+def grouped_backtest(df, matriz, por, mercado='Casa', comissao=0.0, por_responsabilidade=False):
+    por = [por] if isinstance(por, str) else list(por)
+    codigos, grupos = group_codes(df, por)
+    acertos, lucros = settle_markets(df, [mercado], comissao, por_responsabilidade)
+
+    estrategia_idx, linha_idx = np.nonzero(matriz.to_numpy().T)
+    grupo_idx = codigos[linha_idx]
+    com_grupo = grupo_idx >= 0
+    estrategia_idx, linha_idx, grupo_idx = estrategia_idx[com_grupo], linha_idx[com_grupo], grupo_idx[com_grupo]
+
+    n_grupos = len(grupos)
+    celula = estrategia_idx * n_grupos + grupo_idx
+    tamanho = matriz.shape[1] * n_grupos
+    total_jogos = np.bincount(celula, minlength=tamanho)
+    n_acertos = np.bincount(celula, weights=acertos[linha_idx, 0], minlength=tamanho)
+    lucro_total = np.bincount(celula, weights=lucros[linha_idx, 0], minlength=tamanho)
+
+    preenchidas = np.flatnonzero(total_jogos)
+    cubo = grupos.iloc[preenchidas % n_grupos].reset_index(drop=True)
+    cubo.insert(0, "Estratégia", np.asarray(matriz.columns)[preenchidas // n_grupos])
+    jogos = total_jogos[preenchidas]
+    cubo["Total de Jogos"] = jogos
+    cubo["Acertos"] = n_acertos[preenchidas].astype(np.int64)
+    cubo["Taxa de Acerto"] = cubo["Acertos"] / jogos
+    cubo["Lucro Total"] = lucro_total[preenchidas]
+    cubo["ROI"] = cubo["Lucro Total"] / jogos
+    return cubo
@@ -0,0 +1,136 @@
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from cli import write_table
+from engine import (
+    COLUNAS_PROBABILIDADES, ESTRATEGIAS_COMPILADAS, JANELAS_MEDIAS, FeatureStore, build_strategy_matrix,
+    check_moving_averages, reduce_strategies, settle_home_back, summarize_backtest
+)
+from loader import read_matches
+
+# Colunas que determinam o resultado do backtest; usadas para reconhecer linhas já processadas
+COLUNAS_ESTADO = list(COLUNAS_PROBABILIDADES.values()) + ['Goals_H', 'Goals_A']
+
+# Quantos acertos recentes cada estratégia guarda (a maior janela das médias)
+TAMANHO_ULTIMOS = max(JANELAS_MEDIAS)
+
+# Assinatura das linhas, dependente da posição, que pode ser estendida com novas linhas
+# (soma módulo 2**64 dos hashes das linhas, ponderados pela posição no histórico)
+def _row_signature(df, inicio, assinatura=0):
+    hashes = pd.util.hash_pandas_object(df[COLUNAS_ESTADO], index=False).to_numpy()
+    pesos = np.arange(inicio + 1, inicio + len(df) + 1, dtype=np.uint64)
+    parcelas = np.append(hashes * pesos, np.uint64(assinatura))
+    return np.sum(parcelas, dtype=np.uint64)
+
+# Estado vazio: nenhuma linha processada. O estado só tem agregados por estratégia, então
+# seu tamanho (e o custo de gravá-lo) não cresce com o histórico.
+def empty_state():
+    nomes = ESTRATEGIAS_COMPILADAS["Nomes"]
+    return {
+        "nomes": np.array(nomes),
+        "jogos": np.zeros(len(nomes), dtype=np.int64),
+        "acertos": np.zeros(len(nomes), dtype=np.int64),
+        "lucro": np.zeros(len(nomes), dtype=np.float64),
+        "ultimos": np.zeros((len(nomes), TAMANHO_ULTIMOS), dtype=np.int8),
+        "n_ultimos": np.zeros(len(nomes), dtype=np.int64),
+        "n_linhas": np.int64(0),
+        "assinatura": np.uint64(0)
+    }
+
+# Acrescentar só as linhas novas: variáveis, máscaras e agregados são calculados apenas
+# sobre elas e somados ao estado guardado
+def update_state(estado, df_novos):
+    if len(df_novos) == 0:
+        return estado
+
+    mascaras = build_strategy_matrix(FeatureStore(df_novos), ESTRATEGIAS_COMPILADAS)
+    acerto, lucro = settle_home_back(df_novos)
+    total_jogos, acertos, lucro_total = reduce_strategies(mascaras, acerto, lucro, estado["lucro"])
+
+    # Janela dos últimos acertos: o que já estava guardado seguido dos jogos novos
+    ultimos = estado["ultimos"].copy()
+    n_ultimos = estado["n_ultimos"].copy()
+    for j in range(mascaras.shape[1]):
+        novos = acerto[mascaras[:, j]]
+        if len(novos) == 0:
+            continue
+        sequencia = np.concatenate((ultimos[j, TAMANHO_ULTIMOS - n_ultimos[j]:], novos))[-TAMANHO_ULTIMOS:]
+        ultimos[j, TAMANHO_ULTIMOS - len(sequencia):] = sequencia
+        n_ultimos[j] = len(sequencia)
+
+    return {
+        **estado,
+        "jogos": estado["jogos"] + total_jogos,
+        "acertos": estado["acertos"] + acertos,
+        "lucro": lucro_total,
+        "ultimos": ultimos,
+        "n_ultimos": n_ultimos,
+        "n_linhas": np.int64(estado["n_linhas"] + len(df_novos)),
+        "assinatura": _row_signature(df_novos, int(estado["n_linhas"]), estado["assinatura"])
+    }
+
+# Histórico completo reenviado (com os jogos novos no fim): só as linhas além das já
+# processadas são calculadas. Se o início não bate com o estado, tudo é refeito.
+def update_from_history(estado, df_historico):
+    n_linhas = int(estado["n_linhas"])
+    inicio = df_historico.iloc[:n_linhas]
+    if len(df_historico) < n_linhas or _row_signature(inicio, 0) != estado["assinatura"]:
+        return update_state(empty_state(), df_historico)
+    return update_state(estado, df_historico.iloc[n_linhas:])
+
+def save_state(estado, caminho):
+    with open(caminho, "wb") as arquivo:
+        np.savez(arquivo, **estado)
+
+# Estados gravados por versões anteriores podem ter outros campos (a matriz de variáveis);
+# só os campos do estado atual são lidos
+def load_state(caminho):
+    with np.load(caminho, allow_pickle=False) as dados:
+        estado = {chave: dados[chave] for chave in empty_state() if chave in dados.files}
+    estado["n_linhas"] = np.int64(estado["n_linhas"])
+    estado["assinatura"] = np.uint64(estado["assinatura"])
+    return estado
+
+# Resumo do backtest e análise das médias a partir do estado, nos mesmos formatos do engine
+def state_results(estado):
+    nomes = list(estado["nomes"])
+    ultimas = {"Estratégia": nomes}
+    for janela in JANELAS_MEDIAS:
+        jogos = np.minimum(estado["n_ultimos"], janela)
+        ultimas[f"Acertos {janela}"] = estado["ultimos"][:, TAMANHO_ULTIMOS - janela:].sum(axis=1)
+        ultimas[f"Jogos {janela}"] = jogos
+    ultimas = pd.DataFrame(ultimas)[estado["n_ultimos"] > 0]
+    return {
+        "Backtest": summarize_backtest(nomes, estado["jogos"], estado["acertos"], estado["lucro"]),
+        "Médias": check_moving_averages(ultimas, nomes)
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest incremental: processa só as linhas novas do histórico")
+    parser.add_argument("estado", help="Arquivo .npz com o estado guardado (criado se não existir)")
+    parser.add_argument("historico", help="Histórico atualizado, ou só as linhas novas com --somente-novas")
+    parser.add_argument("--somente-novas", action="store_true", help="O arquivo contém apenas as linhas novas")
+    parser.add_argument("--saida", default="resultados", help="Pasta onde os resultados são gravados")
+    parser.add_argument("--formato", choices=["csv", "json"], default="csv", help="Formato dos arquivos de saída")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    caminho_estado = Path(args.estado)
+    estado = load_state(caminho_estado) if caminho_estado.exists() else empty_state()
+
+    df = read_matches(args.historico)
+    estado = update_state(estado, df) if args.somente_novas else update_from_history(estado, df)
+    save_state(estado, caminho_estado)
+
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    resultados = state_results(estado)
+    write_table(pd.DataFrame(resultados["Backtest"]), saida / "resumo_backtest", args.formato)
+    write_table(pd.DataFrame(resultados["Médias"]), saida / "analise_medias", args.formato)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+import hashlib
+import io
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from engine import COLUNAS_PROBABILIDADES
+
+# Colunas de odds usadas pelas variáveis e pelo backtest
+COLUNAS_ODDS = list(COLUNAS_PROBABILIDADES.values())
+
+# Colunas lidas da planilha: odds em float64 (as faixas das estratégias têm 4 casas
+# decimais e são comparadas com os valores exatos), gols em Int8 (inteiro com ausentes,
+# porque a planilha do dia ainda não tem resultado) e textos repetidos (times, horários,
+# liga) como categorias. A liga é opcional.
+TIPOS_COLUNAS = {
+    **{coluna: 'float64' for coluna in COLUNAS_ODDS},
+    'Goals_H': 'Int8',
+    'Goals_A': 'Int8',
+    'Home': 'category',
+    'Away': 'category',
+    'Time': 'category',
+    'League': 'category'
+}
+
+# No CSV os gols são lidos como float (aceita "1.0") e os textos como string;
+# os tipos finais são aplicados depois, como nos outros formatos
+TIPOS_LEITURA_CSV = {
+    **TIPOS_COLUNAS,
+    'Goals_H': 'float32',
+    'Goals_A': 'float32',
+    **{coluna: 'string' for coluna, tipo in TIPOS_COLUNAS.items() if tipo == 'category'}
+}
+
+# Data do jogo (opcional): usada na simulação walk-forward e nos recortes por período
+COLUNA_DATA = 'Date'
+# Liga (opcional): usada nos backtests agrupados
+COLUNA_LIGA = 'League'
+COLUNAS_LIDAS = set(TIPOS_COLUNAS) | {COLUNA_DATA}
+
+FORMATOS = {
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.ftr': 'feather'
+}
+
+# Versão das colunas guardadas no cache; muda sempre que COLUNAS_LIDAS ou os tipos mudam
+VERSAO_CACHE = 5
+
+# Pasta onde as planilhas xlsx convertidas para Parquet ficam guardadas
+PASTA_CACHE = Path(os.environ.get(
+    "BACKTEST_CACHE_DIR", Path.home() / ".cache" / "backtest-estrategias"
+))
+
+# Tamanho máximo do cache (MB): acima dele, os arquivos usados há mais tempo saem primeiro
+LIMITE_CACHE_BYTES = int(float(os.environ.get("BACKTEST_CACHE_MAX_MB", 1024)) * 2 ** 20)
+
+# Temporários de conversões interrompidas são apagados depois deste tempo (segundos)
+IDADE_TEMPORARIOS = 24 * 3600
+
+# Nomes dos arquivos criados pelo cache (conversões e temporários); só eles são apagados
+PADRAO_CACHE = re.compile(r"(?P<hash>[0-9a-f]{40})-v(?P<versao>\d+)(-\w+\.tmp|\.parquet)")
+
+# Formato pelo nome do arquivo (caminho ou arquivo enviado pelo Streamlit)
+def detect_format(arquivo):
+    nome = getattr(arquivo, 'name', arquivo)
+    extensao = Path(str(nome)).suffix.lower()
+    if extensao not in FORMATOS:
+        raise ValueError(f"Formato de arquivo não suportado: {nome}")
+    return FORMATOS[extensao]
+
+def _read_bytes(arquivo):
+    if hasattr(arquivo, 'getvalue'):
+        return arquivo.getvalue()
+    return Path(arquivo).read_bytes()
+
+def _coerce_types(df):
+    tipos = {coluna: tipo for coluna, tipo in TIPOS_COLUNAS.items() if coluna in df.columns}
+    # Categorias sempre de texto comum (o Excel pode devolver horários como datetime.time),
+    # com as mesmas categorias que o Parquet devolve ao ler o cache
+    for coluna, tipo in tipos.items():
+        if tipo == 'category' and not isinstance(df[coluna].dtype, pd.CategoricalDtype):
+            df[coluna] = df[coluna].astype('string').astype(object)
+    df = df.astype(tipos)
+    if COLUNA_DATA in df.columns and not pd.api.types.is_datetime64_any_dtype(df[COLUNA_DATA]):
+        df[COLUNA_DATA] = _parse_dates(df[COLUNA_DATA])
+    return df
+
+# Datas em ISO (2024-01-31) e, no que sobrar, no formato brasileiro (31/01/2024)
+def _parse_dates(valores):
+    datas = pd.to_datetime(valores, format='ISO8601', errors='coerce')
+    faltando = datas.isna() & valores.notna()
+    if faltando.any():
+        datas[faltando] = pd.to_datetime(valores[faltando], dayfirst=True, errors='coerce')
+    return datas
+
+def _read_excel(arquivo, conteudo_hash=None):
+    dados = _read_bytes(arquivo)
+    conteudo_hash = conteudo_hash or hashlib.sha1(dados).hexdigest()
+    cache = PASTA_CACHE / f"{conteudo_hash}-v{VERSAO_CACHE}.parquet"
+    try:
+        # Data de modificação como último uso, para a limpeza manter os usados recentemente
+        os.utime(cache)
+        return pd.read_parquet(cache)
+    except FileNotFoundError:
+        pass
+    _convert_excel(dados, cache)
+    # Sempre lido do Parquet, para o primeiro upload ter os mesmos tipos dos seguintes
+    df = pd.read_parquet(cache)
+    _prune_cache(manter=cache)
+    return df
+
+def _convert_excel(dados, cache):
+    df = pd.read_excel(io.BytesIO(dados), usecols=lambda coluna: coluna in COLUNAS_LIDAS)
+    df = _coerce_types(df)
+    PASTA_CACHE.mkdir(parents=True, exist_ok=True)
+    # Escrever em um temporário próprio e renomear: nunca fica um Parquet pela metade, e
+    # duas sessões convertendo a mesma planilha não escrevem no mesmo arquivo
+    descritor, temporario = tempfile.mkstemp(prefix=f"{cache.stem}-", suffix=".tmp", dir=PASTA_CACHE)
+    os.close(descritor)
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, cache)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+# Limpeza do cache: apaga conversões de outras versões, temporários abandonados e, acima de
+# LIMITE_CACHE_BYTES, as conversões usadas há mais tempo (menos a que acabou de ser gravada)
+def _prune_cache(manter=None):
+    agora = time.time()
+    atuais = []
+    for caminho in PASTA_CACHE.iterdir():
+        nome = PADRAO_CACHE.fullmatch(caminho.name)
+        if nome is None:
+            continue
+        try:
+            info = caminho.stat()
+            if caminho.suffix == ".tmp":
+                if agora - info.st_mtime > IDADE_TEMPORARIOS:
+                    caminho.unlink()
+            elif int(nome["versao"]) != VERSAO_CACHE:
+                caminho.unlink()
+            else:
+                atuais.append((info.st_mtime, info.st_size, caminho))
+        except FileNotFoundError:
+            # Apagado por outra sessão durante a limpeza
+            continue
+
+    total = sum(tamanho for _, tamanho, _ in atuais)
+    for _, tamanho, caminho in sorted(atuais):
+        if total <= LIMITE_CACHE_BYTES:
+            break
+        if caminho != manter:
+            caminho.unlink(missing_ok=True)
+            total -= tamanho
+
+# Parquet e Feather guardam o esquema no arquivo: só as colunas usadas são lidas do disco
+def _read_columnar(arquivo, formato):
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if hasattr(arquivo, 'getvalue'):
+        arquivo = io.BytesIO(arquivo.getvalue())
+    if formato == 'parquet':
+        esquema = pq.read_schema(arquivo).names
+    else:
+        esquema = ipc.open_file(arquivo).schema.names
+    if hasattr(arquivo, 'seek'):
+        arquivo.seek(0)
+
+    colunas = [coluna for coluna in esquema if coluna in COLUNAS_LIDAS]
+    leitor = pd.read_parquet if formato == 'parquet' else pd.read_feather
+    return _coerce_types(leitor(arquivo, columns=colunas))
+
+# Ler histórico ou jogos do dia em qualquer formato suportado, só com as colunas usadas
+def read_matches(arquivo, conteudo_hash=None):
+    formato = detect_format(arquivo)
+    if formato == 'excel':
+        return _read_excel(arquivo, conteudo_hash)
+    if formato == 'csv':
+        df = pd.read_csv(arquivo, usecols=lambda coluna: coluna in COLUNAS_LIDAS, dtype=TIPOS_LEITURA_CSV)
+        return _coerce_types(df)
+    return _read_columnar(arquivo, formato)
+
+# Junta pedaços de tamanhos variados em blocos de exatamente tamanho_bloco linhas
+# (o último pode ser menor)
+def _rechunk(partes, tamanho_bloco):
+    pendentes, n_pendentes = [], 0
+    for parte in partes:
+        pendentes.append(parte)
+        n_pendentes += len(parte)
+        while n_pendentes >= tamanho_bloco:
+            juntos = pd.concat(pendentes, ignore_index=True) if len(pendentes) > 1 else pendentes[0].reset_index(drop=True)
+            yield juntos.iloc[:tamanho_bloco]
+            pendentes, n_pendentes = [juntos.iloc[tamanho_bloco:]], n_pendentes - tamanho_bloco
+    if n_pendentes > 0:
+        yield pd.concat(pendentes, ignore_index=True)
+
+def _iter_columnar(arquivo, formato, tamanho_bloco):
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+
+    if formato == 'parquet':
+        leitor = pq.ParquetFile(arquivo)
+        colunas = [coluna for coluna in leitor.schema_arrow.names if coluna in COLUNAS_LIDAS]
+        for lote in leitor.iter_batches(batch_size=tamanho_bloco, columns=colunas):
+            yield lote.to_pandas()
+    else:
+        leitor = ipc.open_file(arquivo)
+        colunas = [coluna for coluna in leitor.schema.names if coluna in COLUNAS_LIDAS]
+        for i in range(leitor.num_record_batches):
+            yield leitor.get_batch(i).select(colunas).to_pandas()
+
+# Ler um histórico grande em blocos de tamanho fixo, sem carregá-lo inteiro: CSV em pedaços,
+# Parquet por row groups e Feather por record batches, com os mesmos tipos de read_matches
+def iter_matches(arquivo, tamanho_bloco):
+    formato = detect_format(arquivo)
+    if formato == 'csv':
+        partes = pd.read_csv(
+            arquivo, usecols=lambda coluna: coluna in COLUNAS_LIDAS, dtype=TIPOS_LEITURA_CSV, chunksize=tamanho_bloco
+        )
+    elif formato in ('parquet', 'feather'):
+        partes = _iter_columnar(arquivo, formato, tamanho_bloco)
+    else:
+        raise ValueError("Leitura em blocos disponível só para CSV, Parquet e Feather; converta a planilha antes")
+    for bloco in _rechunk(partes, tamanho_bloco):
+        yield _coerce_types(bloco)
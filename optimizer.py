@@ -0,0 +1,136 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import DEFINICOES_VARS, FAIXA_VAR43, get_feature_store, settle_home_back
+from loader import read_matches
+
+COLUNAS_BANDAS = [
+    "Variável", "Mínimo", "Máximo", "Total de Jogos", "Acertos", "Taxa de Acerto", "Lucro Total", "ROI"
+]
+
+# Linhas que passam nos predicados fixos (por padrão a faixa de VAR43), pelo índice das VARs
+def base_rows(features, base):
+    return features.indice.select(list(base))
+
+# Varre todas as faixas [lo, hi] formadas pelos quantis de uma variável.
+# Depois de ordenar os valores uma vez, cada faixa sai em O(1) das somas acumuladas.
+def sweep_bands(var, valores, acerto, lucro, pontos=100, min_jogos=30):
+    finitos = np.isfinite(valores)
+    valores, acerto, lucro = valores[finitos], acerto[finitos], lucro[finitos]
+    if len(valores) == 0:
+        return pd.DataFrame(columns=COLUNAS_BANDAS)
+
+    ordem = np.argsort(valores, kind="stable")
+    valores = valores[ordem]
+    acertos_acumulados = np.concatenate(([0], np.cumsum(acerto[ordem])))
+    lucro_acumulado = np.concatenate(([0.0], np.cumsum(lucro[ordem])))
+
+    limites = np.unique(np.round(np.quantile(valores, np.linspace(0, 1, pontos)), 4))
+    inicio = np.searchsorted(valores, limites, side="left")
+    fim = np.searchsorted(valores, limites, side="right")
+    i_lo, i_hi = np.triu_indices(len(limites), 1)
+
+    total_jogos = fim[i_hi] - inicio[i_lo]
+    acertos = acertos_acumulados[fim[i_hi]] - acertos_acumulados[inicio[i_lo]]
+    lucro_total = lucro_acumulado[fim[i_hi]] - lucro_acumulado[inicio[i_lo]]
+    validas = total_jogos >= max(min_jogos, 1)
+
+    total_jogos, acertos, lucro_total = total_jogos[validas], acertos[validas], lucro_total[validas]
+    return pd.DataFrame({
+        "Variável": var,
+        "Mínimo": limites[i_lo][validas],
+        "Máximo": limites[i_hi][validas],
+        "Total de Jogos": total_jogos,
+        "Acertos": acertos,
+        "Taxa de Acerto": acertos / total_jogos,
+        "Lucro Total": lucro_total,
+        "ROI": lucro_total / total_jogos
+    })
+
+def _sweep_task(argumentos):
+    var, valores, acerto, lucro, pontos, min_jogos, top = argumentos
+    bandas = sweep_bands(var, valores, acerto, lucro, pontos, min_jogos)
+    return rank_bands(bandas).head(top)
+
+def rank_bands(bandas):
+    return bandas.sort_values(
+        ["Lucro Total", "Taxa de Acerto", "Total de Jogos"], ascending=False, ignore_index=True
+    )
+
+# Otimizar a segunda faixa de cada estratégia: para cada variável, varre as faixas
+# sobre as linhas que já passam na base, distribuindo as variáveis entre os núcleos
+def optimize_bands(df, variaveis=None, base=(FAIXA_VAR43,), pontos=100, min_jogos=30, top=20, processos=None):
+    features = get_feature_store(df)
+    acerto, lucro = settle_home_back(df)
+    linhas = base_rows(features, base)
+    acerto, lucro = acerto[linhas], lucro[linhas]
+
+    variaveis = variaveis or [var for var in DEFINICOES_VARS if var not in {b[0] for b in base}]
+    tarefas = [
+        (var, np.asarray(features[var])[linhas], acerto, lucro, pontos, min_jogos, top)
+        for var in variaveis
+    ]
+    if processos == 1:
+        resultados = [_sweep_task(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_sweep_task, tarefas))
+
+    resultados = [r for r in resultados if not r.empty]
+    if not resultados:
+        return pd.DataFrame(columns=COLUNAS_BANDAS)
+    return rank_bands(pd.concat(resultados, ignore_index=True))
+
+# Avalia faixas candidatas (var, lo, hi) já escolhidas, somadas à base: cada uma vira uma
+# busca no índice ordenado das VARs, sem varrer o histórico por faixa
+def score_bands(df, bandas, base=(FAIXA_VAR43,)):
+    features = get_feature_store(df)
+    acerto, lucro = settle_home_back(df)
+    resultados = []
+    for var, lo, hi in bandas:
+        linhas = features.indice.select(list(base) + [(var, lo, hi)])
+        total_jogos = len(linhas)
+        acertos = int(acerto[linhas].sum())
+        lucro_total = lucro[linhas].sum()
+        resultados.append({
+            "Variável": var,
+            "Mínimo": lo,
+            "Máximo": hi,
+            "Total de Jogos": total_jogos,
+            "Acertos": acertos,
+            "Taxa de Acerto": acertos / total_jogos if total_jogos > 0 else 0.0,
+            "Lucro Total": lucro_total,
+            "ROI": lucro_total / total_jogos if total_jogos > 0 else 0.0
+        })
+    return pd.DataFrame(resultados, columns=COLUNAS_BANDAS)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Busca de faixas (lo, hi) para as estratégias")
+    parser.add_argument("historico", help="Planilha histórica (xlsx, csv, parquet ou feather)")
+    parser.add_argument("--variaveis", nargs="+", help="Variáveis a otimizar (padrão: todas)")
+    parser.add_argument("--pontos", type=int, default=100, help="Quantis usados como limites das faixas")
+    parser.add_argument("--min-jogos", type=int, default=30, help="Mínimo de jogos para a faixa ser considerada")
+    parser.add_argument("--top", type=int, default=20, help="Melhores faixas mantidas por variável")
+    parser.add_argument("--candidatas", help="CSV com faixas já escolhidas (Variável, Mínimo, Máximo) para só avaliar, sem varrer")
+    parser.add_argument("--processos", type=int, help="Processos em paralelo (padrão: todos os núcleos)")
+    parser.add_argument("--saida", default="bandas.csv", help="Arquivo CSV com o ranking das faixas")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    df_historico = read_matches(args.historico)
+    if args.candidatas:
+        candidatas = pd.read_csv(args.candidatas)[["Variável", "Mínimo", "Máximo"]]
+        bandas = rank_bands(score_bands(df_historico, candidatas.itertuples(index=False, name=None)))
+    else:
+        bandas = optimize_bands(
+            df_historico, args.variaveis, pontos=args.pontos, min_jogos=args.min_jogos,
+            top=args.top, processos=args.processos
+        )
+    bandas.to_csv(args.saida, index=False)
+
+if __name__ == "__main__":
+    main()
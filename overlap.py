@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from engine import TAMANHO_BLOCO
+
+# Sobreposição máxima (Jaccard) padrão entre estratégias de uma mesma carteira
+LIMITE_SOBREPOSICAO = 0.5
+
+# Sobreposição entre todas as estratégias: jogos em comum, Jaccard e correlação do lucro
+# jogo a jogo (lucro da linha quando a estratégia aposta, zero quando não aposta). Tudo sai
+# de dois produtos matriciais sobre a matriz de máscaras, em blocos de linhas:
+# MᵀM (jogos em comum) e XᵀX, com X = M·lucro (soma dos produtos dos lucros).
+def overlap_matrices(matriz, lucro):
+    mascaras = matriz.to_numpy()
+    n_estrategias = mascaras.shape[1]
+    em_comum = np.zeros((n_estrategias, n_estrategias))
+    produtos = np.zeros((n_estrategias, n_estrategias))
+    lucro_total = np.zeros(n_estrategias)
+    for inicio in range(0, len(mascaras), TAMANHO_BLOCO):
+        fim = inicio + TAMANHO_BLOCO
+        # Contagens em float32 são exatas dentro do bloco; o lucro fica em float64
+        bloco = mascaras[inicio:fim].astype(np.float32)
+        em_comum += bloco.T @ bloco
+        ponderado = mascaras[inicio:fim] * lucro[inicio:fim, np.newaxis]
+        produtos += ponderado.T @ ponderado
+        lucro_total += ponderado.sum(axis=0)
+
+    jogos = np.diag(em_comum)
+    n_linhas = len(mascaras)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jaccard = em_comum / (jogos[:, np.newaxis] + jogos[np.newaxis, :] - em_comum)
+        covariancia = produtos / n_linhas - np.outer(lucro_total, lucro_total) / n_linhas ** 2
+        desvio = np.sqrt(np.diag(covariancia))
+        correlacao = covariancia / np.outer(desvio, desvio)
+
+    nomes = matriz.columns
+    return {
+        "Jogos": pd.Series(jogos.astype(np.int64), index=nomes),
+        "Lucro": pd.Series(lucro_total, index=nomes),
+        "Em Comum": pd.DataFrame(em_comum.astype(np.int64), index=nomes, columns=nomes),
+        "Jaccard": pd.DataFrame(jaccard, index=nomes, columns=nomes),
+        "Correlação": pd.DataFrame(correlacao, index=nomes, columns=nomes)
+    }
+
+# Carteira gulosa: percorre os candidatos do maior para o menor lucro histórico e fica com
+# cada um cuja sobreposição (Jaccard) com os já escolhidos não passa do limite
+def select_low_overlap(sobreposicao, candidatos, limite=LIMITE_SOBREPOSICAO):
+    lucro = sobreposicao["Lucro"]
+    jaccard = sobreposicao["Jaccard"]
+    escolhidas = []
+    for estrategia in sorted(candidatos, key=lambda nome: lucro[nome], reverse=True):
+        if not escolhidas or jaccard.loc[estrategia, escolhidas].max() <= limite:
+            escolhidas.append(estrategia)
+    return escolhidas
+
+# Jogos do dia agrupados por partida: um jogo aprovado por várias estratégias aparece uma
+# vez, com as estratégias que o selecionaram e a stake somada (stake por estratégia). Sem
+# colunas que identifiquem a partida (Time, Home, Away), cada linha fica como está.
+def aggregate_daily_stakes(jogos_do_dia, stake=1.0):
+    partida = [coluna for coluna in jogos_do_dia.columns if coluna != "Estratégia"]
+    if partida:
+        agregados = jogos_do_dia.groupby(partida, sort=False, observed=True, dropna=False).agg(**{
+            "Estratégias": ("Estratégia", ", ".join),
+            "Número de Estratégias": ("Estratégia", "size")
+        }).reset_index()
+    else:
+        agregados = pd.DataFrame({
+            "Estratégias": jogos_do_dia["Estratégia"].to_numpy(dtype=object),
+            "Número de Estratégias": np.ones(len(jogos_do_dia), dtype=np.int64)
+        })
+    agregados["Stake Total"] = agregados["Número de Estratégias"] * stake
+    return agregados
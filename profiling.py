@@ -0,0 +1,91 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+
+# Quantas funções / linhas de alocação entram no relatório detalhado
+LIMITE_RELATORIO = 25
+
+# Cronômetros e contadores por etapa do pipeline. No modo detalhado, também captura
+# cProfile e tracemalloc (mais lento; use só para investigar). Usado como contexto
+# (with Profiler(...) as perfil), finish é chamado mesmo se o pipeline falhar, e o
+# tracemalloc só é parado se foi este perfil que o iniciou.
+class Profiler:
+    def __init__(self, detalhado=False):
+        self.detalhado = detalhado
+        self.etapas = []
+        self.contadores = {}
+        self._cprofile = cProfile.Profile() if detalhado else None
+        self._snapshot = None
+        self._iniciou_tracemalloc = detalhado and not tracemalloc.is_tracing()
+        if self._iniciou_tracemalloc:
+            tracemalloc.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.finish()
+        return False
+
+    # Uso: with perfil.stage("run_backtest", linhas=n) as etapa: ...; etapa["Bytes"] = ...
+    @contextmanager
+    def stage(self, nome, linhas=None):
+        etapa = {"Etapa": nome, "Linhas": linhas}
+        if self.detalhado:
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+            self._cprofile.enable()
+        inicio = time.perf_counter()
+        try:
+            yield etapa
+        finally:
+            etapa["Segundos"] = time.perf_counter() - inicio
+            if self.detalhado:
+                self._cprofile.disable()
+                memoria_final, pico = tracemalloc.get_traced_memory()
+                etapa["Bytes Retidos"] = memoria_final - memoria_inicial
+                etapa["Pico de Bytes"] = pico - memoria_inicial
+            self.etapas.append(etapa)
+
+    def count(self, nome, valor):
+        self.contadores[nome] = valor
+
+    def finish(self):
+        if self.detalhado and tracemalloc.is_tracing() and self._snapshot is None:
+            self._snapshot = tracemalloc.take_snapshot()
+        if self._iniciou_tracemalloc:
+            tracemalloc.stop()
+            self._iniciou_tracemalloc = False
+
+    def report(self):
+        relatorio = {"Etapas": self.etapas, "Contadores": self.contadores}
+        if self.detalhado:
+            saida = io.StringIO()
+            pstats.Stats(self._cprofile, stream=saida).sort_stats("cumulative").print_stats(LIMITE_RELATORIO)
+            relatorio["cProfile"] = saida.getvalue()
+            if self._snapshot is not None:
+                relatorio["tracemalloc"] = [
+                    str(estatistica) for estatistica in self._snapshot.statistics("lineno")[:LIMITE_RELATORIO]
+                ]
+        return relatorio
+
+    def to_json(self, caminho):
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(report_json(self.report()))
+
+def report_json(relatorio):
+    return json.dumps(relatorio, ensure_ascii=False, indent=2, default=_json_default)
+
+# Tipos do numpy nos contadores viram tipos nativos no JSON
+def _json_default(valor):
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
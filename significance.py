@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import MERCADOS, market_payoffs, settle_markets
+
+# Elementos (reamostras x jogos) gerados por lote: limita a memória das estratégias com muitos
+# jogos e mantém os arrays temporários pequenos (perto do cache)
+LIMITE_ELEMENTOS = 262_144
+
+COLUNAS_SIGNIFICANCIA = [
+    "Estratégia", "Total de Jogos", "ROI", "ROI IC Inferior", "ROI IC Superior",
+    "Taxa de Acerto", "Acerto IC Inferior", "Acerto IC Superior", "Taxa Implícita",
+    "p-valor Lucro", "p-valor Acerto", "Drawdown Máximo", "Drawdown Mediano", "Drawdown P95"
+]
+
+# Maior queda do lucro acumulado em relação ao pico anterior (o pico inicial é zero),
+# para cada linha de uma matriz (caminhos x jogos)
+def max_drawdown(caminhos):
+    acumulado = np.cumsum(caminhos, axis=1)
+    pico = np.maximum.accumulate(acumulado, axis=1)
+    np.maximum(pico, 0, out=pico)
+    np.subtract(pico, acumulado, out=pico)
+    return pico.max(axis=1)
+
+# Reamostras de uma estratégia, em lotes de índices (reamostras x jogos) sem laço por reamostra:
+# - bootstrap dos jogos: ROI, taxa de acerto e drawdown máximo de cada reamostra
+# - hipótese nula (as odds são justas): cada jogo acerta com a probabilidade implícita,
+#   para comparar o lucro e os acertos observados
+def resample_strategy(acerto, lucro, ganho, perda, prob, n_reamostras, rng):
+    n_jogos = len(lucro)
+    reamostras = {
+        chave: np.empty(n_reamostras)
+        for chave in ["ROI", "Taxa de Acerto", "Drawdown", "Lucro Nulo", "Acertos Nulo"]
+    }
+    # Lucro de um caminho nulo: todos perdem, e cada acerto soma ganho + perda
+    perda_total, diferenca = -perda.sum(), ganho + perda
+    lote = max(1, LIMITE_ELEMENTOS // n_jogos)
+    for inicio in range(0, n_reamostras, lote):
+        fim = min(inicio + lote, n_reamostras)
+        indices = rng.integers(0, n_jogos, (fim - inicio, n_jogos), dtype=np.int32)
+        amostra = lucro[indices]
+        reamostras["ROI"][inicio:fim] = amostra.mean(axis=1)
+        reamostras["Taxa de Acerto"][inicio:fim] = acerto[indices].mean(axis=1)
+        reamostras["Drawdown"][inicio:fim] = max_drawdown(amostra)
+
+        acertou = rng.random((fim - inicio, n_jogos), dtype=np.float32) < prob
+        reamostras["Lucro Nulo"][inicio:fim] = perda_total + acertou @ diferenca
+        reamostras["Acertos Nulo"][inicio:fim] = np.count_nonzero(acertou, axis=1)
+    return reamostras
+
+# Resumo de uma estratégia (executado nos processos); a semente é própria da estratégia,
+# então o resultado não depende de quantos processos são usados
+def _significance_task(argumentos):
+    estrategia_nome, acerto, lucro, ganho, perda, prob, n_reamostras, nivel, semente = argumentos
+    reamostras = resample_strategy(acerto, lucro, ganho, perda, prob, n_reamostras, np.random.default_rng(semente))
+    n_jogos = len(lucro)
+    lucro_total = lucro.sum()
+    acertos_total = acerto.sum()
+    percentis = [50 * (1 - nivel), 50 * (1 + nivel)]
+    roi_ic = np.percentile(reamostras["ROI"], percentis)
+    acerto_ic = np.percentile(reamostras["Taxa de Acerto"], percentis)
+    resumo = {
+        "Estratégia": estrategia_nome,
+        "Total de Jogos": n_jogos,
+        "ROI": lucro_total / n_jogos,
+        "ROI IC Inferior": roi_ic[0],
+        "ROI IC Superior": roi_ic[1],
+        "Taxa de Acerto": acertos_total / n_jogos,
+        "Acerto IC Inferior": acerto_ic[0],
+        "Acerto IC Superior": acerto_ic[1],
+        "Taxa Implícita": prob.mean(),
+        "p-valor Lucro": (1 + np.sum(reamostras["Lucro Nulo"] >= lucro_total - 1e-9)) / (1 + n_reamostras),
+        "p-valor Acerto": (1 + np.sum(reamostras["Acertos Nulo"] >= acertos_total)) / (1 + n_reamostras),
+        "Drawdown Máximo": max_drawdown(lucro[np.newaxis])[0],
+        "Drawdown Mediano": np.median(reamostras["Drawdown"]),
+        "Drawdown P95": np.percentile(reamostras["Drawdown"], 95)
+    }
+    return resumo, reamostras["Drawdown"]
+
+# Significância dos resultados de cada estratégia em um mercado: intervalos de confiança
+# (percentis do bootstrap) para ROI e taxa de acerto, p-valores unilaterais contra as
+# probabilidades implícitas nas odds e a distribuição do drawdown máximo. As estratégias
+# são distribuídas entre os núcleos (processos=1 roda tudo no processo atual).
+# "Resumo" tem uma linha por estratégia com jogos com odd; "Drawdowns", uma linha por reamostra.
+def bootstrap_significance(df, matriz, mercado='Casa', n_reamostras=5000, nivel=0.95, seed=0,
+                           comissao=0.0, por_responsabilidade=False, processos=None):
+    if mercado not in MERCADOS:
+        raise ValueError(f"Mercado desconhecido: '{mercado}'")
+
+    acertos, lucros = settle_markets(df, [mercado], comissao, por_responsabilidade)
+    acerto, lucro = acertos[:, 0], lucros[:, 0]
+    ganho, perda, prob = market_payoffs(df, mercado, comissao, por_responsabilidade)
+    # Jogos sem odd ficam fora das duas amostras: sem probabilidade implícita não há hipótese
+    # nula, e o acerto do placar contaria como observado sem poder acontecer no simulado
+    com_odd = ~(np.isnan(ganho) | np.isnan(perda) | np.isnan(prob))
+
+    mascaras = matriz.to_numpy()
+    sementes = np.random.SeedSequence(seed).spawn(mascaras.shape[1])
+    tarefas = []
+    for j, estrategia_nome in enumerate(matriz.columns):
+        linhas = np.flatnonzero(mascaras[:, j] & com_odd)
+        if len(linhas) > 0:
+            tarefas.append((
+                estrategia_nome, acerto[linhas], lucro[linhas], ganho[linhas], perda[linhas], prob[linhas],
+                n_reamostras, nivel, sementes[j]
+            ))
+    if processos == 1:
+        resultados = [_significance_task(tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            resultados = list(executor.map(_significance_task, tarefas))
+
+    drawdowns = [
+        pd.DataFrame({"Estratégia": resumo["Estratégia"], "Drawdown": drawdown}) for resumo, drawdown in resultados
+    ]
+    return {
+        "Resumo": pd.DataFrame([resumo for resumo, _ in resultados], columns=COLUNAS_SIGNIFICANCIA),
+        "Drawdowns": pd.concat(drawdowns, ignore_index=True) if drawdowns else pd.DataFrame(columns=["Estratégia", "Drawdown"])
+    }
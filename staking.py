@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from engine import MERCADOS, market_payoffs, settle_markets
+
+METODOS_STAKE = ['Fixa', 'Percentual', 'Kelly']
+
+# Peso (em acertos esperados fictícios) da hipótese sem vantagem na estimativa do Kelly: ela
+# é o ponto de partida e o histórico da própria estratégia (só apostas anteriores) vai
+# ajustando a estimativa
+PESO_PROBABILIDADE_IMPLICITA = 20
+
+# Mercados back que, juntos, cobrem todos os resultados: a soma das implícitas passa de 1
+# pela margem da casa, e dividir por ela dá a probabilidade sem margem
+MERCADOS_COMPLEMENTARES = {
+    'Casa': ['Casa', 'Empate', 'Fora'],
+    'Empate': ['Casa', 'Empate', 'Fora'],
+    'Fora': ['Casa', 'Empate', 'Fora'],
+    'Over 2.5': ['Over 2.5', 'Under 2.5'],
+    'Under 2.5': ['Over 2.5', 'Under 2.5'],
+    'BTTS Sim': ['BTTS Sim', 'BTTS Não'],
+    'BTTS Não': ['BTTS Sim', 'BTTS Não']
+}
+
+COLUNAS_STAKING = [
+    "Estratégia", "Método", "Apostas", "Volume Apostado", "Banca Final", "Lucro", "Retorno",
+    "Drawdown Máximo", "Drawdown Máximo (%)", "Maior Sequência de Derrotas", "Apostas Encerradas"
+]
+
+# Probabilidade implícita sem a margem da casa; nos mercados sem complementares (lay de
+# placar) ou com alguma odd ausente, fica a implícita
+def fair_probability(df, mercado):
+    prob = market_payoffs(df, mercado)[2]
+    if mercado not in MERCADOS_COMPLEMENTARES:
+        return prob
+    soma = sum(market_payoffs(df, outro)[2] for outro in MERCADOS_COMPLEMENTARES[mercado])
+    return np.where(np.isnan(soma), prob, prob / soma)
+
+# Probabilidade de acerto antes de cada aposta: a probabilidade sem margem da própria odd
+# vezes a razão entre acertos e acertos esperados (soma das probabilidades) nas apostas
+# anteriores, encolhida para 1. A vantagem é medida em relação ao preço de cada aposta, então
+# odds longas não parecem vantajosas só porque a taxa de acerto média da estratégia é maior
+# que a implícita; e, sem vantagem, a estimativa fica abaixo do preço (a margem da casa).
+def estimated_probability(acerto, prob):
+    acertos_anteriores = np.cumsum(acerto) - acerto
+    esperados_anteriores = np.cumsum(prob) - prob
+    razao = (acertos_anteriores + PESO_PROBABILIDADE_IMPLICITA) / (esperados_anteriores + PESO_PROBABILIDADE_IMPLICITA)
+    return np.minimum(prob * razao, 1.0)
+
+# Fração da banca pelo Kelly para ganho/perda por unidade apostada: p / perda - q / ganho,
+# sem apostar quando não há vantagem (ou a odd está ausente)
+def kelly_fractions(acerto, prob, ganho, perda):
+    p = estimated_probability(acerto, prob)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fracoes = p / perda - (1 - p) / ganho
+    validas = (ganho > 0) & (perda > 0)
+    return np.where(validas, np.clip(fracoes, 0, None), 0.0)
+
+# Stakes e banca depois de cada aposta de uma estratégia, em ordem. Stake fixa soma o lucro
+# (cumsum); percentual e Kelly multiplicam a banca (cumprod), porque a fração apostada não
+# depende da banca. O stop-loss (fração da banca inicial perdida) e a falta de saldo para a
+# stake fixa encerram as apostas: daí em diante a banca fica parada.
+def stake_curve(lucro, acerto, prob, ganho, perda, metodo='Fixa', banca_inicial=100.0, stake=1.0,
+                percentual=0.02, fracao_kelly=0.25, stop_loss=None):
+    if metodo == 'Fixa':
+        stakes = np.full(len(lucro), float(stake))
+        banca = banca_inicial + np.cumsum(stakes * lucro)
+    else:
+        if metodo == 'Percentual':
+            fracoes = np.full(len(lucro), float(percentual))
+        else:
+            fracoes = fracao_kelly * kelly_fractions(acerto, prob, ganho, perda)
+        banca = banca_inicial * np.cumprod(np.maximum(1 + fracoes * lucro, 0))
+        stakes = fracoes * np.concatenate(([banca_inicial], banca[:-1]))
+
+    antes = np.concatenate(([banca_inicial], banca[:-1]))
+    limite = banca_inicial * (1 - stop_loss) if stop_loss is not None else 0.0
+    parou = (antes <= limite) | ((antes < stake) if metodo == 'Fixa' else False)
+    acionado = bool(parou.any())
+    if acionado:
+        parada = int(np.argmax(parou))
+        banca[parada:] = antes[parada]
+        stakes[parada:] = 0.0
+    return stakes, banca, acionado
+
+# Maior sequência de apostas perdidas seguidas (apostas com stake zero não contam)
+def longest_losing_streak(lucro, stakes):
+    apostadas = stakes > 0
+    perdida = lucro[apostadas] < 0
+    if len(perdida) == 0:
+        return 0
+    posicao = np.arange(len(perdida))
+    ultima_sem_perda = np.maximum.accumulate(np.where(perdida, -1, posicao))
+    return int((posicao - ultima_sem_perda).max())
+
+# Simulação de banca de todas as estratégias, apostando em ordem nos jogos de cada uma.
+# "Resumo" tem uma linha por estratégia com jogos; "Curvas", a banca após cada aposta.
+def simulate_staking(df, matriz, metodo='Fixa', banca_inicial=100.0, stake=1.0, percentual=0.02,
+                     fracao_kelly=0.25, stop_loss=None, mercado='Casa', comissao=0.0, por_responsabilidade=False):
+    if metodo not in METODOS_STAKE:
+        raise ValueError(f"Método de stake desconhecido: '{metodo}'")
+    if mercado not in MERCADOS:
+        raise ValueError(f"Mercado desconhecido: '{mercado}'")
+
+    acertos, lucros = settle_markets(df, [mercado], comissao, por_responsabilidade)
+    acerto, lucro = acertos[:, 0], lucros[:, 0]
+    ganho, perda, _ = (np.nan_to_num(valores, nan=0.0) for valores in market_payoffs(df, mercado, comissao, por_responsabilidade))
+    prob = np.nan_to_num(fair_probability(df, mercado), nan=0.0)
+
+    mascaras = matriz.to_numpy()
+    resumo, curvas = [], []
+    for j, estrategia_nome in enumerate(matriz.columns):
+        linhas = np.flatnonzero(mascaras[:, j])
+        if len(linhas) == 0:
+            continue
+        stakes, banca, acionado = stake_curve(
+            lucro[linhas], acerto[linhas], prob[linhas], ganho[linhas], perda[linhas],
+            metodo, banca_inicial, stake, percentual, fracao_kelly, stop_loss
+        )
+        pico = np.maximum.accumulate(np.concatenate(([banca_inicial], banca)))[1:]
+        queda = pico - banca
+        resumo.append({
+            "Estratégia": estrategia_nome,
+            "Método": metodo,
+            "Apostas": int(np.count_nonzero(stakes)),
+            "Volume Apostado": stakes.sum(),
+            "Banca Final": banca[-1],
+            "Lucro": banca[-1] - banca_inicial,
+            "Retorno": banca[-1] / banca_inicial - 1,
+            "Drawdown Máximo": queda.max(),
+            "Drawdown Máximo (%)": (queda / pico).max(),
+            "Maior Sequência de Derrotas": longest_losing_streak(lucro[linhas], stakes),
+            "Apostas Encerradas": acionado
+        })
+        curvas.append(pd.DataFrame({
+            "Estratégia": estrategia_nome,
+            "Linha": matriz.index[linhas],
+            "Aposta": np.arange(1, len(linhas) + 1),
+            "Stake": stakes,
+            "Banca": banca
+        }))
+
+    return {
+        "Resumo": pd.DataFrame(resumo, columns=COLUNAS_STAKING),
+        "Curvas": pd.concat(curvas, ignore_index=True) if curvas else pd.DataFrame(columns=["Estratégia", "Linha", "Aposta", "Stake", "Banca"])
+    }
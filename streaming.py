@@ -0,0 +1,68 @@
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from cli import write_table
+from engine import TAMANHO_BLOCO
+from incremental import empty_state, save_state, state_results, update_state
+from loader import iter_matches
+from profiling import Profiler
+
+# Linhas lidas por vez. Múltiplo de TAMANHO_BLOCO: o lucro é somado nos mesmos blocos que
+# no backtest em memória, então os resultados são idênticos, não só próximos
+TAMANHO_LEITURA = 4 * TAMANHO_BLOCO
+
+# Menor múltiplo de TAMANHO_BLOCO que comporta tamanho_bloco linhas
+def aligned_block_size(tamanho_bloco):
+    if tamanho_bloco < 1:
+        raise ValueError(f"Tamanho de bloco inválido: {tamanho_bloco}")
+    return -(-tamanho_bloco // TAMANHO_BLOCO) * TAMANHO_BLOCO
+
+# Backtest de um histórico maior que a memória: cada bloco lido tem suas VARs, máscaras e
+# resultados calculados e é acumulado no estado do modo incremental (jogos, acertos, lucro
+# e os últimos acertos de cada estratégia para as médias); a memória fica limitada ao bloco.
+# O tamanho do bloco é arredondado para cima até um múltiplo de TAMANHO_BLOCO.
+def stream_history(arquivo, tamanho_bloco=TAMANHO_LEITURA, estado=None, perfil=None):
+    tamanho_bloco = aligned_block_size(tamanho_bloco)
+    estado = estado or empty_state()
+    perfil = perfil or Profiler()
+    with perfil.stage("stream_history") as etapa:
+        blocos = 0
+        for df_bloco in iter_matches(arquivo, tamanho_bloco):
+            estado = update_state(estado, df_bloco)
+            blocos += 1
+        etapa["Linhas"] = int(estado["n_linhas"])
+        etapa["Blocos"] = blocos
+        etapa["Tamanho do Bloco"] = tamanho_bloco
+    return estado
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest em blocos de históricos maiores que a memória (CSV, Parquet ou Feather)")
+    parser.add_argument("historico", help="Histórico em CSV, Parquet ou Feather")
+    parser.add_argument("--tamanho-bloco", type=int, default=TAMANHO_LEITURA, help=f"Linhas lidas por vez (arredondado para cima até um múltiplo de {TAMANHO_BLOCO})")
+    parser.add_argument("--estado", help="Gravar o estado final (.npz) para atualizações com incremental.py")
+    parser.add_argument("--saida", default="resultados", help="Pasta onde os resultados são gravados")
+    parser.add_argument("--formato", choices=["csv", "json"], default="csv", help="Formato dos arquivos de saída")
+    parser.add_argument("--perfil", help="Arquivo JSON com o tempo da leitura em blocos")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.tamanho_bloco < 1:
+        raise SystemExit("O tamanho do bloco precisa ser positivo")
+    perfil = Profiler()
+    estado = stream_history(args.historico, args.tamanho_bloco, perfil=perfil)
+    if args.estado:
+        save_state(estado, Path(args.estado))
+
+    saida = Path(args.saida)
+    saida.mkdir(parents=True, exist_ok=True)
+    resultados = state_results(estado)
+    write_table(pd.DataFrame(resultados["Backtest"]), saida / "resumo_backtest", args.formato)
+    write_table(pd.DataFrame(resultados["Médias"]), saida / "analise_medias", args.formato)
+    if args.perfil:
+        perfil.to_json(args.perfil)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+# Maior número de gols considerado no cálculo das probabilidades de 1X2
+MAX_GOLS = 10
+
+def _poisson_pmf(lambdas):
+    pmf = np.empty((len(lambdas), MAX_GOLS + 1))
+    pmf[:, 0] = np.exp(-lambdas)
+    for k in range(1, MAX_GOLS + 1):
+        pmf[:, k] = pmf[:, k - 1] * lambdas / k
+    return pmf
+
+def _back_odds(prob, margem):
+    return np.maximum(np.round(1 / (prob * (1 + margem)), 2), 1.01)
+
+def _lay_odds(prob, spread):
+    return np.maximum(np.round(1 / (prob * (1 - spread)), 2), 1.01)
+
+# Jogos sintéticos com odds coerentes entre si: gols de casa e fora seguem Poisson
+# independentes, as odds saem das probabilidades verdadeiras com margem da casa e
+# os placares sorteados seguem o mesmo modelo
+def generate_matches(n_linhas, seed=0, n_times=40, n_ligas=4, inicio="2018-01-01"):
+    rng = np.random.default_rng(seed)
+    forca_ataque = rng.lognormal(0.25, 0.25, n_times)
+    forca_defesa = rng.lognormal(0.0, 0.2, n_times)
+
+    casa = rng.integers(0, n_times, n_linhas)
+    fora = (casa + rng.integers(1, n_times, n_linhas)) % n_times
+    lambda_h = forca_ataque[casa] / forca_defesa[fora] * 1.15
+    lambda_a = forca_ataque[fora] / forca_defesa[casa] * 0.9
+
+    pmf_h = _poisson_pmf(lambda_h)
+    pmf_a = _poisson_pmf(lambda_a)
+    cdf_a = np.cumsum(pmf_a, axis=1)
+    p_h = np.einsum('ij,ij->i', pmf_h[:, 1:], cdf_a[:, :-1])
+    p_d = np.einsum('ij,ij->i', pmf_h, pmf_a)
+    p_a = np.clip(1 - p_h - p_d, 1e-6, None)
+
+    lambda_total = lambda_h + lambda_a
+    p_over = 1 - np.exp(-lambda_total) * (1 + lambda_total + lambda_total ** 2 / 2)
+    p_btts = (1 - np.exp(-lambda_h)) * (1 - np.exp(-lambda_a))
+    p_0x0 = pmf_h[:, 0] * pmf_a[:, 0]
+    p_0x1 = pmf_h[:, 0] * pmf_a[:, 1]
+    p_1x0 = pmf_h[:, 1] * pmf_a[:, 0]
+
+    margem = rng.uniform(0.02, 0.06, n_linhas)
+    spread = rng.uniform(0.0, 0.03, n_linhas)
+    datas = pd.Timestamp(inicio) + pd.to_timedelta(np.sort(rng.integers(0, max(n_linhas // 50, 1), n_linhas)), unit="D")
+    horarios = pd.to_timedelta(rng.integers(24, 46, n_linhas) * 30, unit="min")
+
+    return pd.DataFrame({
+        'Date': datas,
+        'Time': (pd.Timestamp(inicio) + horarios).strftime('%H:%M'),
+        'League': pd.Categorical.from_codes(rng.integers(0, n_ligas, n_linhas), [f"Liga {i + 1}" for i in range(n_ligas)]),
+        'Home': pd.Categorical.from_codes(casa, [f"Time {i + 1}" for i in range(n_times)]),
+        'Away': pd.Categorical.from_codes(fora, [f"Time {i + 1}" for i in range(n_times)]),
+        'Odd_H_Back': _back_odds(p_h, margem),
+        'Odd_D_Back': _back_odds(p_d, margem),
+        'Odd_A_Back': _back_odds(p_a, margem),
+        'Odd_Over25_FT_Back': _back_odds(p_over, margem),
+        'Odd_Under25_FT_Back': _back_odds(1 - p_over, margem),
+        'Odd_BTTS_Yes_Back': _back_odds(p_btts, margem),
+        'Odd_BTTS_No_Back': _back_odds(1 - p_btts, margem),
+        'Odd_CS_0x0_Lay': _lay_odds(p_0x0, spread),
+        'Odd_CS_0x1_Lay': _lay_odds(p_0x1, spread),
+        'Odd_CS_1x0_Lay': _lay_odds(p_1x0, spread),
+        'Goals_H': rng.poisson(lambda_h).astype(np.float64),
+        'Goals_A': rng.poisson(lambda_a).astype(np.float64)
+    })
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from engine import apply_strategies, rolling_hit_rates, settle_home_back
+from loader import COLUNA_DATA
+
+# Simulação walk-forward da regra das médias: a cada dia, cada estratégia só é aprovada
+# com as médias dos jogos de dias anteriores, e só então aposta nos jogos do dia.
+# O estado da estratégia no fim do dia anterior sai das mesmas somas acumuladas das
+# médias móveis, em O(1) por jogo, sem recalcular janelas dia a dia.
+def walk_forward(df, coluna_data=COLUNA_DATA):
+    if coluna_data not in df.columns:
+        raise ValueError(f"A simulação walk-forward precisa da coluna '{coluna_data}' com a data dos jogos")
+
+    df = df.sort_values(coluna_data, kind="stable").reset_index(drop=True)
+    datas = df[coluna_data].dt.normalize().to_numpy()
+    estrategias = apply_strategies(df)
+    acerto, lucro = settle_home_back(df)
+    medias_moveis = rolling_hit_rates(estrategias, acerto)
+
+    estrategia = medias_moveis["Estratégia"].to_numpy()
+    linha = medias_moveis["Linha"].to_numpy()
+    data = datas[linha]
+
+    # Primeiro jogo de cada (estratégia, dia); o jogo anterior a ele é o último de um dia passado
+    posicao = np.arange(len(linha))
+    novo_dia = np.ones(len(linha), dtype=bool)
+    novo_dia[1:] = (estrategia[1:] != estrategia[:-1]) | (data[1:] != data[:-1])
+    primeiro_do_dia = np.maximum.accumulate(np.where(novo_dia, posicao, 0))
+    anterior = primeiro_do_dia - 1
+    tem_historico = (anterior >= 0) & (estrategia[np.maximum(anterior, 0)] == estrategia)
+
+    aprovada = medias_moveis["Acima dos Limiares"].to_numpy()
+    aprovada = tem_historico & aprovada[np.maximum(anterior, 0)]
+
+    apostas = pd.DataFrame({
+        "Estratégia": estrategia,
+        "Linha": linha,
+        "Data": data,
+        "Aprovada": aprovada,
+        "Acerto": acerto[linha],
+        "Lucro Sem Filtro": lucro[linha],
+        "Lucro": np.where(aprovada, lucro[linha], 0.0)
+    })
+
+    curva = apostas.groupby("Data").agg(**{
+        "Apostas": ("Aprovada", "sum"),
+        "Lucro": ("Lucro", "sum"),
+        "Lucro Sem Filtro": ("Lucro Sem Filtro", "sum")
+    })
+    curva["Lucro Acumulado"] = curva["Lucro"].cumsum()
+    curva["Lucro Acumulado Sem Filtro"] = curva["Lucro Sem Filtro"].cumsum()
+
+    resumo = apostas.assign(Acertos=apostas["Aprovada"] & apostas["Acerto"]).groupby("Estratégia").agg(**{
+        "Jogos": ("Aprovada", "size"),
+        "Apostas": ("Aprovada", "sum"),
+        "Acertos": ("Acertos", "sum"),
+        "Lucro Total": ("Lucro", "sum"),
+        "Lucro Sem Filtro": ("Lucro Sem Filtro", "sum")
+    }).reindex(estrategias.columns, fill_value=0)
+
+    return {
+        "Apostas": apostas,
+        "Curva": curva.reset_index(),
+        "Resumo": resumo.rename_axis("Estratégia").reset_index()
+    }